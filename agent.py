@@ -1,41 +1,63 @@
 # agent.py
+import contextvars
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
 from medical_knowledge import search_medical_knowledge
+from embedding_service import encode
+from retrieval_cache import normalize_query, embedding_cache, context_cache
+from vector_store import get_index
 from groq import Groq
 
-from memory import load_history
+from prompt_builder import build_messages
+from triage import classify, ROUTINE
+from metrics import instrumented, record, timed
+from startup import loading
 
 # Load environment variables
 load_dotenv()
 
 # === Environment Variables ===
-pinecone_api_key = os.getenv("PINECONE_API_KEY")
-pinecone_index_name = os.getenv("PINECONE_INDEX")
-pinecone_env = os.getenv("PINECONE_ENVIRONMENT")
 groq_api_key = os.getenv("GROQ_API_KEY")
+retrieval_timeout = float(os.getenv("RETRIEVAL_QUERY_TIMEOUT", "2.0"))  # seconds per index query
 
-# Initialize Pinecone connection
-try:
-    pc = Pinecone(api_key=pinecone_api_key, environment=pinecone_env)
-    index = pc.Index(pinecone_index_name)
-    print("✅ Pinecone initialized.")
-except Exception as e:
-    print(f"[❌ Pinecone Initialization Error] {e}")
-    index = None  # Set index to None if initialization fails
-
-# === Initialize Groq ===
-try:
-    groq_client = Groq(api_key=groq_api_key)
-    print("✅ Groq client initialized.")
-except Exception as e:
-    print(f"[❌ Groq Initialization Error] {e}")
-    groq_client = None
-
-# Load SentenceTransformer model (384-dimensional output)
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# Vector index and Groq client are created on first use (or by the server's warm-up thread)
+_groq_client = None
+_groq_lock = threading.Lock()
+
+
+def _get_index():
+    """Return the vector index (Pinecone, or the local index when selected / unreachable), or None"""
+    try:
+        return get_index()
+    except Exception as e:
+        print(f"[❌ Vector Index Initialization Error] {e}")
+        return None
+
+
+def get_groq_client():
+    """Return the shared Groq client, creating it on first use (None if that fails)"""
+    global _groq_client
+
+    if _groq_client is not None:
+        return _groq_client
+
+    with _groq_lock:
+        if _groq_client is None:
+            try:
+                with loading("llm"):
+                    _groq_client = Groq(api_key=groq_api_key)
+                print("✅ Groq client initialized.")
+            except Exception as e:
+                print(f"[❌ Groq Initialization Error] {e}")
+    return _groq_client
+
+
+# Thread pool used to issue the general and medical index queries concurrently
+retrieval_pool = ThreadPoolExecutor(max_workers=int(os.getenv("RETRIEVAL_WORKERS", "8")),
+                                    thread_name_prefix="retrieval")
 
 # Clifton Hospital system prompt
 SYSTEM_PROMPT = """You are Dr. Assistant, a medical AI assistant for Clifton Hospital located at Street 8, Shah Allah Ditta, Islamabad. Your primary responsibilities are:
@@ -71,99 +93,252 @@ IMPORTANT GUIDELINES:
 Remember: Patient safety is the top priority. When in doubt, refer to a doctor or emergency services."""
 
 # === Context Search ===
-def search_context(query, top_k=3):
-    if index is None:
-        print("[⚠️ Pinecone not initialized. Skipping context search.]")
-        return ""
+def _timed(fn, *args, **kwargs):
+    """Run fn and return (result, elapsed milliseconds)"""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+@instrumented("general_query")
+def _query_general_context(embedding, top_k):
+    results = get_index().query(vector=embedding, top_k=top_k, include_metadata=True)
+    return "\n".join([match["metadata"]["text"] for match in results.get("matches", [])])
 
-    try:
-        # Get query embedding
-        embedding = model.encode(query).tolist()
 
-        # Query Pinecone
-        results = index.query(vector=embedding, top_k=top_k, include_metadata=True)
-        general_context = "\n".join([match["metadata"]["text"] for match in results.get("matches", [])])
+@instrumented("medical_query")
+def _query_medical_context(query, embedding):
+    medical_context = search_medical_knowledge(query, top_k=2, query_embedding=embedding)
+    return "\n".join([item["text"] for item in medical_context])
 
-        # Medical knowledge context
-        medical_context = search_medical_knowledge(query, top_k=2)
-        medical_text = "\n".join([item["text"] for item in medical_context])
 
-        # Combine context
-        context_parts = []
-        if medical_text:
-            context_parts.append(f"Medical Knowledge:\n{medical_text}")
-        if general_context:
-            context_parts.append(f"Additional Context:\n{general_context}")
+def _collect(future, deadline, stage, timings):
+    """Wait for a retrieval future until the shared deadline; return None if it missed it"""
+    try:
+        result, elapsed_ms = future.result(timeout=max(deadline - time.monotonic(), 0))
+        timings[f"{stage}_ms"] = elapsed_ms
+        return result
+    except FutureTimeoutError:
+        print(f"[⚠️ {stage} timed out after {retrieval_timeout:.1f}s, continuing without it]")
+        timings[f"{stage}_ms"] = None
+    except Exception as e:
+        print(f"[❌ {stage} failed] {e}")
+        timings[f"{stage}_ms"] = None
+    return None
+
+
+def get_query_embedding(query):
+    """Embedding of query, from the embedding cache when possible"""
+    cache_key = normalize_query(query)
+    embedding = embedding_cache.get(cache_key)
+    if embedding is None:
+        with timed("embedding"):
+            embedding = encode([query])[0].tolist()
+        embedding_cache.set(cache_key, embedding)
+    return embedding
+
+
+@instrumented("retrieval")
+def search_context(query, top_k=3, timings=None, query_embedding=None):
+    """
+    Retrieve general and medical context for a query.
+
+    Both index queries run concurrently and each gets RETRIEVAL_QUERY_TIMEOUT
+    seconds; a slow or failing query is dropped and the turn continues with
+    whatever context came back in time.
+
+    Args:
+        query (str): Latest user message.
+        top_k (int): Number of general-context matches to include.
+        timings (dict, optional): Filled with per-stage latencies in milliseconds
+            (embed_ms, general_query_ms, medical_query_ms, retrieval_ms) plus a
+            cache_hit flag. A stage that timed out or failed is recorded as None.
+        query_embedding (list, optional): Embedding of query if the caller already has it.
+
+    Returns:
+        str: Combined context text, or "" if nothing was found.
+    """
+    if timings is None:
+        timings = {}
+
+    if _get_index() is None:
+        print("[⚠️ Vector index not initialized. Skipping context search.]")
+        return ""
 
-        return "\n\n".join(context_parts).strip()
+    # Repeated questions are served straight from the cache
+    cache_key = normalize_query(query)
+    cached_context = context_cache.get(cache_key)
+    if cached_context is not None:
+        timings["cache_hit"] = True
+        return cached_context
+    timings["cache_hit"] = False
 
+    try:
+        # Get query embedding once and reuse it for both lookups
+        start = time.perf_counter()
+        embedding = query_embedding if query_embedding is not None else get_query_embedding(query)
+        timings["embed_ms"] = (time.perf_counter() - start) * 1000
     except Exception as e:
         print(f"[❌ Context Search Error] {e}")
         return ""
 
+    # Issue general and medical queries concurrently
+    start = time.perf_counter()
+    deadline = time.monotonic() + retrieval_timeout
+    # Each in a copy of this request's context, so their timings land in its breakdown
+    general_future = retrieval_pool.submit(contextvars.copy_context().run, _timed, _query_general_context,
+                                           embedding, top_k)
+    medical_future = retrieval_pool.submit(contextvars.copy_context().run, _timed, _query_medical_context,
+                                           query, embedding)
 
-def determine_urgency(query):
-    """Determine if the query indicates a medical emergency"""
-    emergency_keywords = [
-        "chest pain", "can't breathe", "difficulty breathing", "severe pain",
-        "bleeding heavily", "unconscious", "stroke", "heart attack",
-        "severe allergic reaction", "anaphylaxis", "head injury",
-        "high fever", "severe headache", "can't move", "emergency"
-    ]
+    general_context = _collect(general_future, deadline, "general_query", timings)
+    medical_text = _collect(medical_future, deadline, "medical_query", timings)
+    timings["retrieval_ms"] = (time.perf_counter() - start) * 1000
 
-    query_lower = query.lower()
-    for keyword in emergency_keywords:
-        if keyword in query_lower:
-            return True
-    return False
+    print("⏱️ Context search: " + ", ".join(
+        f"{stage}={'timeout' if ms is None else f'{ms:.1f}'}"
+        for stage, ms in timings.items() if stage.endswith("_ms")))
 
+    # Combine context
+    context_parts = []
+    if medical_text:
+        context_parts.append(f"Medical Knowledge:\n{medical_text}")
+    if general_context:
+        context_parts.append(f"Additional Context:\n{general_context}")
 
-def get_response(history):
-    if groq_client is None:
-        print("[⚠️ Groq client not initialized. Cannot get response.]")
-        return "I'm sorry, I'm currently unable to connect to my knowledge base. Please try again later or call 911 for emergencies."
+    context = "\n\n".join(context_parts).strip()
 
-    try:
-        # Get the latest user message
-        user_message = next((msg["content"] for msg in reversed(history) if msg["role"] == "user"), "")
+    # Only cache complete results so a transient timeout isn't remembered
+    if general_context is not None and medical_text is not None:
+        context_cache.set(cache_key, context)
+    return context
 
-        # Check for emergency situations
-        is_urgent = determine_urgency(user_message)
 
-        # Search for relevant context
-        context = search_context(user_message)
+@instrumented("urgency")
+def determine_urgency(query, embedding=None):
+    """
+    Triage the query: compiled emergency patterns, then similarity to the emergency categories.
 
-        # Prepare messages for Groq API
-        messages = load_history()
-        messages.append({"role": "system", "content": SYSTEM_PROMPT})
+    Returns:
+        dict: severity (emergency, urgent or routine) and the matched category (see triage.classify).
+    """
+    return classify(query, embedding)
 
-        if context:
-            messages.append({"role": "system", "content": f"Relevant Information:\n{context}"})
 
-        if is_urgent:
-            messages.append({"role": "system",
-                             "content": "⚠️ URGENT: This appears to be a medical emergency. Prioritize immediate medical attention in your response."})
+NO_CLIENT_RESPONSE = "I'm sorry, I'm currently unable to connect to my knowledge base. Please try again later or call 911 for emergencies."
+ERROR_RESPONSE = "I'm experiencing technical difficulties. For urgent medical matters, please call 911 or visit Clifton Hospital emergency department immediately."
 
-            # Add conversation history
-        messages.extend(history)
+GROQ_MODEL = "llama3-8b-8192"  # You can choose a different model if needed
+
+
+def prepare_messages(history):
+    """Run urgency detection and retrieval, then assemble the Groq messages for this turn"""
+    # Get the latest user message
+    user_message = next((msg["content"] for msg in reversed(history) if msg["role"] == "user"), "")
+
+    # One embedding serves both triage and retrieval
+    try:
+        embedding = get_query_embedding(user_message) if user_message else None
+    except Exception as e:
+        print(f"[❌ Query Embedding Error] {e}")
+        embedding = None
+
+    # Check for emergency situations
+    triage = determine_urgency(user_message, embedding)
+    is_urgent = triage["severity"] != ROUTINE
+    if is_urgent:
+        print(f"🚨 Triage: {triage['severity']} ({triage['category']}, via {triage['source']})")
+    elif triage["category"]:
+        print(f"🩺 Triage: close to {triage['category']} (similarity {triage['score']}), not escalated")
+
+    # Search for relevant context
+    context = search_context(user_message, query_embedding=embedding)
+
+    # Prepare messages for Groq API within the token budget
+    messages, prompt_tokens, dropped_turns = build_messages(history, SYSTEM_PROMPT, context, is_urgent)
+    print(f"🧮 Prompt: {prompt_tokens} tokens, {len(messages)} messages"
+          + (f", {dropped_turns} older turns summarized" if dropped_turns else ""))
+    return messages
+
+
+def _create_completion(messages, stream):
+    return get_groq_client().chat.completions.create(
+        messages=messages,
+        model=GROQ_MODEL,
+        temperature=0.7,
+        max_tokens=1024,
+        top_p=1,
+        stop=None,
+        stream=stream,
+    )
+
+
+def get_response(history):
+    if get_groq_client() is None:
+        print("[⚠️ Groq client not initialized. Cannot get response.]")
+        return NO_CLIENT_RESPONSE
+
+    try:
+        messages = prepare_messages(history)
 
         # Send to Groq API
-        chat_completion = groq_client.chat.completions.create(
-            messages=messages,
-            model="llama3-8b-8192",  # You can choose a different model if needed
-            temperature=0.7,
-            max_tokens=1024,
-            top_p=1,
-            stop=None,
-            stream=False,
-        )
+        with timed("llm"):
+            chat_completion = _create_completion(messages, stream=False)
 
         assistant_response = chat_completion.choices[0].message.content
         return assistant_response
 
     except Exception as e:
         print(f"[❌ Groq API Error] {e}")
-        return "I'm experiencing technical difficulties. For urgent medical matters, please call 911 or visit Clifton Hospital emergency department immediately."
+        return ERROR_RESPONSE
+
+
+def stream_response(history, timings=None):
+    """
+    Yield the assistant reply in text chunks as Groq generates them.
+
+    Args:
+        history (list): Conversation messages, latest user message last.
+        timings (dict, optional): Filled with llm_ttft_ms (time to first token,
+            including retrieval) and llm_total_ms.
+    """
+    if timings is None:
+        timings = {}
+    start = time.perf_counter()
+
+    if get_groq_client() is None:
+        print("[⚠️ Groq client not initialized. Cannot get response.]")
+        yield NO_CLIENT_RESPONSE
+        return
+
+    produced = False
+    failed = False
+    llm_start = None  # set once retrieval is done and the Groq call starts
+    try:
+        messages = prepare_messages(history)
+
+        llm_start = time.perf_counter()
+        for chunk in _create_completion(messages, stream=True):
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            if not produced:
+                timings["llm_ttft_ms"] = (time.perf_counter() - start) * 1000
+                record("llm_first_token", time.perf_counter() - llm_start)
+                produced = True
+            yield delta
+
+    except Exception as e:
+        failed = True
+        print(f"[❌ Groq API Error] {e}")
+        # Only fall back to the canned reply if nothing was sent yet
+        if not produced:
+            yield ERROR_RESPONSE
+
+    finally:
+        timings["llm_total_ms"] = (time.perf_counter() - start) * 1000
+        if llm_start is not None:
+            record("llm", time.perf_counter() - llm_start, error=failed)
 
 
 def format_appointment_request(patient_info):
@@ -0,0 +1,109 @@
+# audio_encoding.py
+import os
+import threading
+import uuid
+
+from dotenv import load_dotenv
+
+from audio_io import resample, to_float32
+from scheduler import KeyedLocks
+
+# Load environment variables
+load_dotenv()
+
+# === Configuration ===
+# libsndfile compression level, 0.0 (best quality) to 1.0 (smallest file)
+AUDIO_COMPRESSION_LEVEL = float(os.getenv("AUDIO_COMPRESSION_LEVEL", "0.5"))
+
+# Served formats; compressed variants are written next to the WAV as <name>.wav<extension>
+AUDIO_FORMATS = {
+    "opus": {"mimetype": "audio/ogg", "extension": ".ogg", "format": "OGG", "subtype": "OPUS"},
+    "mp3": {"mimetype": "audio/mpeg", "extension": ".mp3", "format": "MP3", "subtype": "MPEG_LAYER_III"},
+    "wav": {"mimetype": "audio/wav", "extension": "", "format": None, "subtype": None},
+}
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+_encode_locks = KeyedLocks()
+_stats_lock = threading.Lock()
+_stats = {"encoded": 0, "failed": 0, "wav_bytes": 0, "encoded_bytes": 0}
+
+
+def negotiate(accept_mimetypes, requested=None):
+    """
+    Pick the format to serve.
+
+    Args:
+        accept_mimetypes: request.accept_mimetypes.
+        requested (str, optional): Explicit ?format= from the client, which wins.
+
+    Returns:
+        str: A key of AUDIO_FORMATS.
+    """
+    if requested in AUDIO_FORMATS:
+        return requested
+    # Only explicitly listed types count; */* from a plain <audio> request keeps WAV
+    listed = {value.split(";")[0].strip().lower(): quality for value, quality in accept_mimetypes}
+    for name in ("opus", "mp3"):
+        if listed.get(AUDIO_FORMATS[name]["mimetype"], 0) > 0:
+            return name
+    return "wav"
+
+
+def encode(source, target, name):
+    """Encode the WAV at source into format name at target"""
+    import soundfile as sf
+
+    spec = AUDIO_FORMATS[name]
+    audio, rate = sf.read(source, dtype="float32", always_2d=True)
+    audio = to_float32(audio)
+    if name == "opus" and rate not in OPUS_SAMPLE_RATES:
+        # Opus only runs at these rates; Tacotron produces 22.05 kHz
+        audio, rate = resample(audio, rate, 24000), 24000
+
+    tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        sf.write(tmp_path, audio, rate, format=spec["format"], subtype=spec["subtype"],
+                 compression_level=AUDIO_COMPRESSION_LEVEL)
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def encoded_variant(path, name):
+    """
+    Return (path, mimetype) of the audio at path in format name.
+
+    The variant is encoded on first request and reused afterwards; if encoding
+    fails the original WAV is returned.
+    """
+    spec = AUDIO_FORMATS[name]
+    if not spec["extension"]:
+        return path, spec["mimetype"]
+
+    target = path + spec["extension"]
+    if os.path.exists(target):
+        return target, spec["mimetype"]
+
+    try:
+        with _encode_locks.hold(target):
+            if not os.path.exists(target):
+                encode(path, target, name)
+                with _stats_lock:
+                    _stats["encoded"] += 1
+                    _stats["wav_bytes"] += os.path.getsize(path)
+                    _stats["encoded_bytes"] += os.path.getsize(target)
+        return target, spec["mimetype"]
+    except Exception as e:
+        print(f"⚠️ Could not encode {os.path.basename(path)} as {name}: {e}")
+        with _stats_lock:
+            _stats["failed"] += 1
+        return path, AUDIO_FORMATS["wav"]["mimetype"]
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["compression_ratio"] = (round(stats["wav_bytes"] / stats["encoded_bytes"], 2)
+                                  if stats["encoded_bytes"] else None)
+    return stats
@@ -0,0 +1,126 @@
+# audio_io.py
+import io
+import os
+import subprocess
+import tempfile
+import threading
+
+import numpy as np
+
+SAMPLE_RATE = 16000  # Whisper expects 16 kHz mono float32
+
+# How often each decode path was taken, to spot clients sending formats that force the disk fallback
+_stats_lock = threading.Lock()
+_stats = {"in_process": 0, "ffmpeg_pipe": 0, "ffmpeg_file": 0}
+
+
+def _count(path):
+    with _stats_lock:
+        _stats[path] += 1
+
+
+def to_float32(samples):
+    """Convert PCM samples of any common dtype/channel layout to mono float32 in [-1, 1]"""
+    samples = np.asarray(samples)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if samples.dtype == np.uint8:
+        return (samples.astype(np.float32) - 128) / 128
+    if np.issubdtype(samples.dtype, np.integer):
+        return samples.astype(np.float32) / np.iinfo(samples.dtype).max
+    return samples.astype(np.float32, copy=False)
+
+
+def resample(audio, rate, target_rate=SAMPLE_RATE):
+    """Resample mono float32 audio to target_rate"""
+    if rate == target_rate:
+        return audio
+    import torch
+    import torchaudio.functional
+
+    return torchaudio.functional.resample(torch.from_numpy(audio), rate, target_rate).numpy()
+
+
+def from_pcm(data, sample_rate=SAMPLE_RATE, dtype=np.int16, channels=1):
+    """Decode headerless PCM bytes (e.g. streamed from a microphone) to 16 kHz float32"""
+    samples = np.frombuffer(data, dtype=dtype)
+    if channels > 1:
+        samples = samples.reshape(-1, channels)
+    return resample(to_float32(samples), sample_rate)
+
+
+def _ffmpeg(source, data=None):
+    """Decode with ffmpeg to 16 kHz mono s16le; source is a path or "pipe:0" with data on stdin"""
+    command = ["ffmpeg", "-loglevel", "error", "-threads", "0", "-i", source,
+               "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "pipe:1"]
+    result = subprocess.run(command, input=data, capture_output=True, check=True)
+    return to_float32(np.frombuffer(result.stdout, dtype=np.int16))
+
+
+def decode_bytes(data, suffix=".wav"):
+    """
+    Decode an in-memory audio file (WAV, FLAC, OGG, WebM, ...) to 16 kHz float32.
+
+    Formats libsndfile understands are decoded in-process; anything else is
+    piped through ffmpeg. Only containers ffmpeg can't read from a pipe (e.g.
+    MP4 with its index at the end) are written to a temporary file.
+    """
+    try:
+        import soundfile as sf
+
+        samples, rate = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+        _count("in_process")
+        return resample(to_float32(samples), rate)
+    except Exception:
+        pass
+
+    try:
+        audio = _ffmpeg("pipe:0", data)
+        if len(audio):
+            _count("ffmpeg_pipe")
+            return audio
+    except subprocess.CalledProcessError:
+        pass
+
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        tmp.write(data)
+    try:
+        audio = _ffmpeg(tmp.name)
+        _count("ffmpeg_file")
+        return audio
+    finally:
+        os.unlink(tmp.name)
+
+
+def load_audio(source, sample_rate=SAMPLE_RATE):
+    """
+    Turn any supported audio input into a 16 kHz mono float32 array.
+
+    Args:
+        source (str | bytes | np.ndarray): File path, encoded file bytes, or
+            PCM samples (int or float, mono or multi-channel) at sample_rate.
+        sample_rate (int): Sample rate of an ndarray source.
+
+    Returns:
+        np.ndarray: float32 samples at 16 kHz.
+    """
+    if isinstance(source, np.ndarray):
+        return resample(to_float32(source), sample_rate)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return decode_bytes(bytes(source))
+    if isinstance(source, str):
+        try:
+            import soundfile as sf
+
+            samples, rate = sf.read(source, dtype="float32", always_2d=True)
+            _count("in_process")
+            return resample(to_float32(samples), rate)
+        except Exception:
+            _count("ffmpeg_file")
+            return _ffmpeg(source)
+    raise TypeError(f"Unsupported audio input: {type(source).__name__}")
+
+
+def get_stats():
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,130 @@
+# audio_store.py
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# === Configuration ===
+AUDIO_DIR = os.getenv("AUDIO_DIR", os.path.join(tempfile.gettempdir(), "clifton_audio"))
+AUDIO_TTL = float(os.getenv("AUDIO_TTL", "900"))  # seconds a generated reply stays downloadable
+AUDIO_MAX_MB = float(os.getenv("AUDIO_MAX_MB", "500"))
+AUDIO_SWEEP_INTERVAL = float(os.getenv("AUDIO_SWEEP_INTERVAL", "60"))  # seconds between sweeps
+
+# <kind>_<32 hex id>[_<segment number>].<ext>[.<encoded ext>], e.g. segment_9f...c1_003.wav.ogg
+_FILENAME = re.compile(r"^[a-z]+_[0-9a-f]{32}(_\d{3})?(\.[a-z0-9]+){1,2}$")
+
+
+class AudioStore:
+    """
+    Dedicated directory for generated reply audio.
+
+    Every file gets a unique ID, so concurrent replies never collide, and
+    lookups are a single path check. A background sweeper deletes files older
+    than ttl and, if the directory is still over max_bytes, the oldest files
+    until it fits.
+    """
+
+    def __init__(self, directory=AUDIO_DIR, ttl=AUDIO_TTL, max_bytes=int(AUDIO_MAX_MB * 1024 * 1024),
+                 sweep_interval=AUDIO_SWEEP_INTERVAL):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self._stats = {"files": 0, "bytes": 0, "expired": 0, "evicted": 0, "last_sweep": None}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def new_id(self):
+        return uuid.uuid4().hex
+
+    def new_path(self, kind="response", extension=".wav"):
+        """Path for a new file of the given kind with a unique ID"""
+        return os.path.join(self.directory, f"{kind}_{self.new_id()}{extension}")
+
+    def lookup(self, filename):
+        """Path of a stored file by name, or None if it is unknown or already swept"""
+        if not _FILENAME.match(filename):
+            return None
+        path = os.path.join(self.directory, filename)
+        return path if os.path.isfile(path) else None
+
+    def sweep(self):
+        """Delete expired files, then the oldest ones while over the size cap"""
+        now = time.time()
+        files = []
+        expired = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or not _FILENAME.match(entry.name):
+                    continue
+                try:
+                    stat = entry.stat()
+                    if now - stat.st_mtime > self.ttl:
+                        os.remove(entry.path)
+                        expired += 1
+                    else:
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+                except OSError:
+                    continue  # removed concurrently
+
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        files.sort()
+        while total > self.max_bytes and files:
+            _, size, path = files.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._stats["files"] = len(files)
+            self._stats["bytes"] = total
+            self._stats["expired"] += expired
+            self._stats["evicted"] += evicted
+            self._stats["last_sweep"] = now
+        if expired or evicted:
+            print(f"🧹 Audio store: removed {expired} expired and {evicted} over-size files")
+
+    def _run_sweeper(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"⚠️ Audio sweep failed: {e}")
+
+    def start_sweeper(self):
+        """Sweep once now, then periodically on a daemon thread"""
+        self.sweep()
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._run_sweeper, daemon=True)
+            self._sweeper.start()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        usage = shutil.disk_usage(self.directory)
+        stats.update({
+            "directory": self.directory,
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl,
+            "disk_free_bytes": usage.free,
+            "disk_total_bytes": usage.total,
+        })
+        return stats
+
+
+# Process-wide store used by run_server
+audio_store = AudioStore()
@@ -0,0 +1,268 @@
+# benchmark_e2e.py
+"""
+End-to-end benchmark of the voice pipeline with offline stand-ins for Pinecone and Groq.
+
+Usage:
+    python benchmark_e2e.py clips/ --concurrency 1 4 8 --requests 40 --output results/HEAD.json
+    python benchmark_e2e.py clips/ --baseline results/main.json
+
+Every request uploads a WAV clip from the corpus to the real /process_voice
+view through Flask's test client, so in-memory decoding, Whisper, the
+embedding model, retrieval, urgency detection, prompt building, session
+history and Tacotron all run for real. Only the network services are
+replaced: Pinecone by the local vector index (seeded with the medical
+knowledge base) plus --vector-latency-ms per query, and Groq by a fake
+client that answers after --llm-ttft-ms and streams a token every
+--llm-token-ms. Retrieval and TTS caches are disabled unless --warm-caches
+is given, so every request pays for every stage.
+
+For each concurrency level the script reports throughput and p50/p95/p99
+latency overall and per stage, and writes everything (with the commit it
+ran on) as JSON; --baseline prints the change against an earlier run.
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import tempfile
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+FAKE_REPLY = ("Thank you for reaching out to Clifton Hospital. For mild symptoms, rest, drink plenty of fluids "
+              "and monitor your temperature. If things get worse or you notice anything severe, please see one "
+              "of our doctors or call 911 right away. Would you like me to book an appointment for you?")
+
+
+class FakeGroq:
+    """Stands in for the Groq client: a canned reply with configurable time to first token and token rate"""
+
+    def __init__(self, ttft_ms, token_ms, reply=FAKE_REPLY):
+        self.ttft = ttft_ms / 1000
+        self.token_interval = token_ms / 1000
+        self.tokens = [word + " " for word in reply.split()]
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def create(self, messages, stream=False, **kwargs):
+        if not stream:
+            time.sleep(self.ttft + self.token_interval * len(self.tokens))
+            message = types.SimpleNamespace(content="".join(self.tokens).strip())
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+        return self._stream()
+
+    def _stream(self):
+        time.sleep(self.ttft)
+        for i, token in enumerate(self.tokens):
+            if i:
+                time.sleep(self.token_interval)
+            delta = types.SimpleNamespace(content=token)
+            yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)])
+
+
+class LatencyIndex:
+    """Stands in for the Pinecone index: the local index with a fixed network round trip added to every query"""
+
+    def __init__(self, index, latency_ms):
+        self.index = index
+        self.latency = latency_ms / 1000
+
+    def query(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return self.index.query(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.index, name)
+
+
+def configure_environment(work_dir, warm_caches):
+    """Point every store at a scratch directory; must run before the server modules are imported"""
+    os.environ.update({
+        "VECTOR_BACKEND": "local",
+        "LOCAL_INDEX_DIR": os.path.join(work_dir, "vector_index"),
+        "SESSION_DIR": os.path.join(work_dir, "sessions"),
+        "AUDIO_DIR": os.path.join(work_dir, "audio"),
+        "TTS_CACHE_DIR": os.path.join(work_dir, "tts_cache"),
+        "WARMUP": "0",
+        "METRICS_RESPONSE_TIMINGS": "1",
+    })
+    if not warm_caches:
+        os.environ["RETRIEVAL_CACHE_SIZE"] = "0"
+        os.environ["TTS_CACHE_ADMIT_AFTER"] = str(10 ** 9)
+
+
+def load_corpus(directory):
+    """Raw bytes of every .wav clip in directory"""
+    clips = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(".wav"):
+            with open(os.path.join(directory, name), "rb") as file:
+                clips.append((name, file.read()))
+    return clips
+
+
+def percentiles(values):
+    """p50/p95/p99 (nearest rank) and mean of values in milliseconds"""
+    if not values:
+        return None
+    values = sorted(values)
+
+    def rank(fraction):
+        return round(values[min(max(int(len(values) * fraction + 0.5) - 1, 0), len(values) - 1)], 1)
+
+    return {"p50": rank(0.5), "p95": rank(0.95), "p99": rank(0.99), "mean": round(sum(values) / len(values), 1)}
+
+
+def setup_pipeline(args):
+    """Import the server with the fakes installed, seed the index and load every model up front"""
+    import agent
+    import vector_store
+    import run_server
+    from medical_knowledge import load_medical_knowledge
+
+    vector_store._index = LatencyIndex(vector_store.LocalVectorIndex(), args.vector_latency_ms)
+    vector_store._backend = "fake-pinecone"
+    agent._groq_client = FakeGroq(args.llm_ttft_ms, args.llm_token_ms)
+
+    start = time.perf_counter()
+    run_server.get_stt_backend()
+    run_server.get_tts_model()
+    run_server.get_embedding_model()
+    load_medical_knowledge()
+    return run_server.app, round(time.perf_counter() - start, 1)
+
+
+def send_clip(app, clip):
+    """Run one /process_voice request; returns (status code, wall milliseconds, stage timings)"""
+    name, audio = clip
+    client = app.test_client(use_cookies=False)  # every request is its own conversation
+    start = time.perf_counter()
+    response = client.post("/process_voice", data={"audio": (io.BytesIO(audio), name)},
+                           content_type="multipart/form-data")
+    elapsed = (time.perf_counter() - start) * 1000
+    body = response.get_json(silent=True) or {}
+    return response.status_code, elapsed, body.get("timings", {})
+
+
+def run_level(app, clips, concurrency, total_requests):
+    with ThreadPoolExecutor(concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda i: send_clip(app, clips[i % len(clips)]), range(total_requests)))
+        elapsed = time.perf_counter() - start
+
+    ok = [(latency, timings) for status, latency, timings in results if status == 200]
+    stage_values = {}
+    for _, timings in ok:
+        for stage, ms in timings.items():
+            if stage.endswith("_ms") and stage != "total_ms" and ms is not None:
+                stage_values.setdefault(stage[:-3], []).append(ms)
+
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "ok": len(ok),
+        "busy": sum(1 for status, _, _ in results if status == 503),
+        "errors": sum(1 for status, _, _ in results if status not in (200, 503)),
+        "duration_s": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 3),
+        "latency_ms": percentiles([latency for latency, _ in ok]),
+        "stages_ms": {stage: percentiles(values) for stage, values in sorted(stage_values.items())},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_level(level):
+    latency = level["latency_ms"] or {}
+    print(f"\n▶ concurrency {level['concurrency']}: {level['throughput_rps']} req/s, "
+          f"p50 {latency.get('p50')}ms, p95 {latency.get('p95')}ms, p99 {latency.get('p99')}ms "
+          f"({level['ok']} ok, {level['busy']} busy, {level['errors']} errors)")
+    print(f"   {'stage':<20}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for stage, values in level["stages_ms"].items():
+        print(f"   {stage:<20}{values['p50']:>10}{values['p95']:>10}{values['p99']:>10}")
+
+
+def compare(results, baseline, baseline_path):
+    """Print throughput and p95 changes against an earlier run"""
+    previous = {level["concurrency"]: level for level in baseline["levels"]}
+
+    print(f"\n📊 Against {baseline_path} (commit {baseline.get('commit')}):")
+    for level in results["levels"]:
+        old = previous.get(level["concurrency"])
+        if old is None or not old["throughput_rps"] or not old["latency_ms"] or not level["latency_ms"]:
+            continue
+        throughput = (level["throughput_rps"] / old["throughput_rps"] - 1) * 100
+        p95 = (level["latency_ms"]["p95"] / old["latency_ms"]["p95"] - 1) * 100
+        print(f"   concurrency {level['concurrency']}: throughput {throughput:+.1f}%, p95 latency {p95:+.1f}%")
+        for stage, values in level["stages_ms"].items():
+            old_stage = old["stages_ms"].get(stage)
+            if old_stage and old_stage["p95"]:
+                print(f"      {stage:<20} p95 {(values['p95'] / old_stage['p95'] - 1) * 100:+.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end /process_voice benchmark with fake Pinecone and Groq")
+    parser.add_argument("clips", help="Directory of .wav clips to upload")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8], help="Parallel clients per level")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per concurrency level")
+    parser.add_argument("--llm-ttft-ms", type=float, default=300, help="Fake Groq time to first token")
+    parser.add_argument("--llm-token-ms", type=float, default=10, help="Fake Groq time between tokens")
+    parser.add_argument("--vector-latency-ms", type=float, default=40, help="Fake Pinecone round trip per query")
+    parser.add_argument("--warm-caches", action="store_true", help="Keep the retrieval and TTS caches enabled")
+    parser.add_argument("--output", help="Path to write the results as JSON")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    # Read the baseline first: --output may overwrite the same file
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    clips = load_corpus(args.clips)
+    if not clips:
+        parser.error(f"No .wav clips found in {args.clips}")
+
+    with tempfile.TemporaryDirectory(prefix="clifton_bench_") as work_dir:
+        configure_environment(work_dir, args.warm_caches)
+
+        print(f"🎧 {len(clips)} clips; loading models...")
+        app, load_time = setup_pipeline(args)
+        print(f"✅ Pipeline ready in {load_time}s")
+
+        # One request per clip so lazy initialisation doesn't land in the first level
+        run_level(app, clips, 1, len(clips))
+
+        results = {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+            "environment": {name: os.getenv(name) for name in
+                            ("STT_BACKEND", "STT_MODEL_SIZE", "STT_QUANTIZE", "TTS_MODEL_NAME", "EMBEDDING_MODEL")},
+            "clip_count": len(clips),
+            "model_load_s": load_time,
+            "levels": [],
+        }
+        for concurrency in args.concurrency:
+            level = run_level(app, clips, concurrency, args.requests)
+            results["levels"].append(level)
+            print_level(level)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"\n📝 Results written to {args.output}")
+
+    if baseline is not None:
+        compare(results, baseline, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
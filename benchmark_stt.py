@@ -0,0 +1,139 @@
+# benchmark_stt.py
+"""
+Compare STT backends on a set of recorded clips.
+
+Usage:
+    python benchmark_stt.py clips/ --configs whisper:base whisper:base:int8 faster-whisper:small:int8
+
+Each clip is a WAV file with a reference transcript next to it (``clip.wav`` +
+``clip.txt``). For every backend:size[:quantize] config the script reports
+word error rate (WER), real-time factor (RTF = processing time / audio
+duration, lower is faster) and model load time.
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+from audio_io import load_audio, SAMPLE_RATE
+from stt_backends import load_backend
+
+
+def normalize_words(text):
+    """Lowercase, strip punctuation and split into words for WER scoring"""
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length"""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1,            # deletion
+                             current[j - 1] + 1,         # insertion
+                             previous[j - 1] + (ref_word != hyp_word))  # substitution
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_clips(directory):
+    """Load (name, float32 16 kHz audio, reference text) for every clip with a transcript"""
+    clips = []
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(".wav"):
+            continue
+        transcript_path = os.path.join(directory, os.path.splitext(name)[0] + ".txt")
+        if not os.path.exists(transcript_path):
+            print(f"⚠️ Skipping {name}: no transcript")
+            continue
+
+        audio = load_audio(os.path.join(directory, name))
+        with open(transcript_path, "r", encoding="utf-8") as file:
+            clips.append((name, audio, file.read().strip()))
+    return clips
+
+
+def parse_config(config):
+    parts = config.split(":")
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Config '{config}' should look like backend:size[:quantize]")
+    return parts[0], parts[1], parts[2] if len(parts) == 3 else "none"
+
+
+def benchmark_config(config, clips):
+    backend_name, size, quantize = parse_config(config)
+    options = {"batching": False} if backend_name == "whisper" else {}
+
+    start = time.perf_counter()
+    backend = load_backend(backend_name, size, quantize, **options)
+    load_time = time.perf_counter() - start
+
+    # Warm-up so one-off initialisation doesn't count against the first clip
+    backend.transcribe(clips[0][1])
+
+    total_audio = total_time = 0.0
+    errors = []
+    per_clip = []
+    for name, audio, reference in clips:
+        start = time.perf_counter()
+        hypothesis = backend.transcribe(audio)
+        elapsed = time.perf_counter() - start
+        duration = len(audio) / SAMPLE_RATE
+
+        wer = word_error_rate(reference, hypothesis)
+        errors.append(wer)
+        total_audio += duration
+        total_time += elapsed
+        per_clip.append({"clip": name, "wer": round(wer, 3), "rtf": round(elapsed / duration, 3),
+                         "hypothesis": hypothesis})
+
+    return {
+        "config": config,
+        "load_time_s": round(load_time, 2),
+        "wer": round(sum(errors) / len(errors), 3),
+        "rtf": round(total_time / total_audio, 3),
+        "audio_seconds": round(total_audio, 1),
+        "clips": per_clip,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark STT backends (WER and real-time factor)")
+    parser.add_argument("clips", help="Directory of .wav clips with matching .txt reference transcripts")
+    parser.add_argument("--configs", nargs="+",
+                        default=["whisper:medium", "whisper:small", "whisper:small:int8", "whisper:base:int8"],
+                        help="backend:size[:quantize] combinations to compare")
+    parser.add_argument("--output", help="Optional path to write the full results as JSON")
+    args = parser.parse_args()
+
+    clips = load_clips(args.clips)
+    if not clips:
+        parser.error(f"No .wav clips with .txt transcripts found in {args.clips}")
+    print(f"🎧 {len(clips)} clips, {sum(len(audio) for _, audio, _ in clips) / SAMPLE_RATE:.1f}s of audio")
+
+    results = []
+    for config in args.configs:
+        print(f"⏳ Benchmarking {config}...")
+        try:
+            results.append(benchmark_config(config, clips))
+        except Exception as e:
+            print(f"❌ {config} failed: {e}")
+
+    print(f"\n{'config':<28}{'WER':>8}{'RTF':>8}{'load s':>9}")
+    for result in results:
+        print(f"{result['config']:<28}{result['wer']:>8.3f}{result['rtf']:>8.3f}{result['load_time_s']:>9.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"\n📝 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# embedding_service.py
+import os
+import threading
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from startup import loading
+
+# Load environment variables
+load_dotenv()
+
+# === Configuration ===
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# Output size of EMBEDDING_MODEL (384 for all-MiniLM-L6-v2); the vector indexes are built with it,
+# so it is checked against the model when it loads
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "384"))
+
+# Process-wide model, loaded on first use
+_model = None
+_model_lock = threading.Lock()
+_stats = {
+    "model_name": EMBEDDING_MODEL_NAME,
+    "loaded": False,
+    "load_time_s": None,
+    "parameter_bytes": None,
+    "rss_delta_bytes": None,
+}
+
+
+def _max_rss_bytes():
+    """Peak resident memory of this process, or None where it can't be read (resource is Unix-only)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def get_model():
+    """Return the shared SentenceTransformer, loading it on first use"""
+    global _model
+
+    if _model is not None:
+        return _model
+
+    with _model_lock:
+        if _model is None:
+            from sentence_transformers import SentenceTransformer
+
+            rss_before = _max_rss_bytes()
+            start = time.perf_counter()
+            with loading("embedding"):
+                model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+                dimension = model.get_sentence_embedding_dimension()
+                if dimension != EMBEDDING_DIMENSION:
+                    raise RuntimeError(f"Embedding model '{EMBEDDING_MODEL_NAME}' outputs {dimension} dimensions "
+                                       f"but EMBEDDING_DIMENSION is {EMBEDDING_DIMENSION}; set EMBEDDING_DIMENSION "
+                                       f"to {dimension} and rebuild the vector index")
+            load_time = time.perf_counter() - start
+
+            parameter_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+            rss_after = _max_rss_bytes()
+            _stats.update({
+                "loaded": True,
+                "load_time_s": round(load_time, 3),
+                "parameter_bytes": parameter_bytes,
+                "rss_delta_bytes": max(rss_after - rss_before, 0) if rss_before is not None else None,
+            })
+            print(f"✅ Embedding model '{EMBEDDING_MODEL_NAME}' loaded in {load_time:.2f}s "
+                  f"({parameter_bytes / (1024 * 1024):.1f} MB weights)")
+            _model = model
+
+    return _model
+
+
+def encode(texts, batch_size=EMBEDDING_BATCH_SIZE):
+    """
+    Encode a list of texts with the shared embedding model.
+
+    Args:
+        texts (list[str]): Texts to embed.
+        batch_size (int): Number of texts per forward pass.
+
+    Returns:
+        np.ndarray: float32 array of shape (len(texts), EMBEDDING_DIMENSION).
+    """
+    if isinstance(texts, str):
+        texts = [texts]
+
+    if not texts:
+        return np.empty((0, EMBEDDING_DIMENSION), dtype=np.float32)
+
+    embeddings = get_model().encode(
+        list(texts),
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def get_stats():
+    """Return load time and memory footprint of the shared model"""
+    return dict(_stats)
@@ -1,8 +1,8 @@
-from sentence_transformers import SentenceTransformer
 import os
 import uuid
 from dotenv import load_dotenv
 import pinecone
+from embedding_service import EMBEDDING_DIMENSION, encode
 
 # Load environment variables
 load_dotenv()
@@ -17,7 +17,7 @@ pinecone_client = pinecone.Pinecone(api_key=PINECONE_API_KEY)
 if INDEX_NAME not in [index.name for index in pinecone_client.list_indexes()]:
     pinecone_client.create_index(
         name=INDEX_NAME,
-        dimension=384,
+        dimension=EMBEDDING_DIMENSION,
         metric="cosine",
         spec=pinecone.PodSpec(environment="gcp-starter")  # or your specific region/environment
     )
@@ -25,9 +25,6 @@ if INDEX_NAME not in [index.name for index in pinecone_client.list_indexes()]:
 # Connect to the index
 index = pinecone_client.Index(INDEX_NAME)
 
-# Load embedding model
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
 # Sample texts
 texts = [
     "I have a headache and fever",
@@ -38,8 +35,8 @@ texts = [
 
 # Create embeddings and upsert
 vectors = []
-for text in texts:
-    emb = model.encode(text).tolist()
+for text, emb in zip(texts, encode(texts)):
+    emb = emb.tolist()
     vectors.append({
         "id": str(uuid.uuid4()),
         "values": emb,
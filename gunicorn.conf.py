@@ -0,0 +1,51 @@
+# gunicorn.conf.py
+"""
+Production serving: gunicorn -c gunicorn.conf.py run_server:app
+
+The master imports the app and loads the model weights once, then forks
+WEB_WORKERS processes that share those pages copy-on-write. Each worker
+serves WEB_THREADS requests concurrently (threads also carry the
+/ws/voice WebSockets) and runs PyTorch on its own share of the cores, so
+CPU-bound Whisper, Tacotron and embedding work scales across cores instead
+of queueing behind one GIL.
+"""
+import os
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# === Configuration ===
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 1)))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))
+# PyTorch intra-op threads per worker; the cores are split between workers by default
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", str(max((os.cpu_count() or 1) // WEB_WORKERS, 1))))
+SSL_CERT = os.getenv("SSL_CERT", "certs/cert.pem")
+SSL_KEY = os.getenv("SSL_KEY", "certs/key.pem")
+
+bind = os.getenv("WEB_BIND", "0.0.0.0:5000")
+workers = WEB_WORKERS
+threads = WEB_THREADS
+worker_class = "gthread"
+preload_app = True
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))  # slow CPU inference must not get workers killed
+graceful_timeout = 30
+
+# HTTPS like the development server, when the certificates exist (the browser needs it for the microphone)
+if SSL_CERT and os.path.exists(SSL_CERT) and os.path.exists(SSL_KEY):
+    certfile = SSL_CERT
+    keyfile = SSL_KEY
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker is forked
+    from run_server import preload_models
+
+    preload_models()
+
+
+def post_fork(server, worker):
+    from run_server import initialize_worker
+
+    initialize_worker(WEB_WORKERS, TORCH_THREADS)
@@ -1,23 +1,14 @@
 # index_data.py
 
-import os
-import uuid
 from dotenv import load_dotenv
-from pinecone import Pinecone
-from sentence_transformers import SentenceTransformer
+from embedding_service import encode
+from vector_store import get_index, content_id, upsert_in_batches
 
 # Load environment variables
 load_dotenv()
 
-# Load SentenceTransformer model (384-dim)
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
-# Initialize Pinecone client
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index_name = os.getenv("PINECONE_INDEX")
-
-# Connect to index
-index = pc.Index(index_name)
+# Connect to the configured vector index (Pinecone or local)
+index = get_index()
 
 # Your text data
 texts = [
@@ -27,13 +18,11 @@ texts = [
     "The clinic accepts all major insurance providers including ABC Health and Medix."
 ]
 
-# Generate embeddings and upsert
-for text in texts:
-    embedding = model.encode(text).tolist()
-    index.upsert([{
-        "id": str(uuid.uuid4()),
-        "values": embedding,
-        "metadata": {"text": text}
-    }])
+# Generate embeddings in one batch and upsert with content-hash IDs (re-runs overwrite, not duplicate)
+vectors = [
+    (content_id(text), embedding.tolist(), {"text": text})
+    for text, embedding in zip(texts, encode(texts))
+]
+upsert_in_batches(index, vectors)
 
-print("✅ Data uploaded to Pinecone index.")
+print("✅ Data uploaded to vector index.")
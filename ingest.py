@@ -0,0 +1,279 @@
+# ingest.py
+"""
+Bulk-ingest hospital documents (doctor rosters, SOPs, FAQs, insurance lists...)
+into the vector index.
+
+Usage:
+    python ingest.py docs/ --source hospital_docs --workers 4
+
+Files are streamed from the directory (txt, md, jsonl, csv), split into
+overlapping word chunks, embedded in large batches on a worker pool and
+upserted with retry/backoff while the next batches are still embedding.
+Finished files are recorded in a checkpoint so a crashed run resumes where it
+stopped; chunk IDs are content hashes, so re-processing a file is harmless.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from embedding_service import encode
+from vector_store import get_index, get_backend, content_id, upsert_in_batches, LocalVectorIndex
+
+# Load environment variables
+load_dotenv()
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".jsonl", ".csv")
+DEFAULT_CHECKPOINT = ".ingest_checkpoint.json"
+
+
+# === Reading and chunking ===
+def iter_files(directory):
+    """Yield supported files under directory in a stable order"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def iter_records(path, text_field="text"):
+    """Yield (text, extra_metadata) records from one file"""
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension in (".txt", ".md"):
+        with open(path, "r", encoding="utf-8", errors="replace") as file:
+            yield file.read(), {}
+
+    elif extension == ".jsonl":
+        with open(path, "r", encoding="utf-8", errors="replace") as file:
+            for line_number, line in enumerate(file, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️ Skipping malformed JSON in {path}:{line_number}")
+                    continue
+                if isinstance(record, dict) and record.get(text_field):
+                    extra = {"category": record["category"]} if "category" in record else {}
+                    yield str(record[text_field]), extra
+
+    elif extension == ".csv":
+        with open(path, "r", encoding="utf-8", errors="replace", newline="") as file:
+            for row in csv.DictReader(file):
+                if row.get(text_field):
+                    text = row[text_field]
+                else:
+                    # Rosters and insurance lists have no prose column, so keep every field
+                    text = "; ".join(f"{key}: {value}" for key, value in row.items() if key and value)
+                if text:
+                    extra = {"category": row["category"]} if row.get("category") else {}
+                    yield text, extra
+
+
+def chunk_text(text, chunk_size=200, overlap=40):
+    """Split text into chunks of chunk_size words, consecutive chunks sharing overlap words"""
+    words = text.split()
+    if not words:
+        return []
+    if len(words) <= chunk_size:
+        return [" ".join(words)]
+
+    step = max(chunk_size - overlap, 1)
+    return [" ".join(words[start:start + chunk_size])
+            for start in range(0, len(words) - overlap, step)]
+
+
+# === Checkpointing ===
+def file_signature(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def load_checkpoint(path):
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (json.JSONDecodeError, IOError):
+            print(f"⚠️ Could not read checkpoint {path}, starting from scratch.")
+    return {"files": {}}
+
+
+def save_checkpoint(path, checkpoint):
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(checkpoint, file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+# === Embedding and upsert ===
+def with_retry(fn, *args, retries=5, base_delay=0.5):
+    """Call fn, retrying with exponential backoff and jitter"""
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = base_delay * (2 ** attempt) * (1 + random.random())
+            print(f"⚠️ {fn.__name__} failed ({e}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+
+def embed_and_upsert(index, chunks, upsert_batch_size, retries):
+    """Embed one batch of (id, text, metadata) chunks and upsert it"""
+    embeddings = encode([text for _, text, _ in chunks])
+    vectors = [
+        (chunk_id, embedding.tolist(), metadata)
+        for (chunk_id, _, metadata), embedding in zip(chunks, embeddings)
+    ]
+    for start in range(0, len(vectors), upsert_batch_size):
+        with_retry(upsert_in_batches, index, vectors[start:start + upsert_batch_size], upsert_batch_size,
+                   retries=retries)
+    return len(vectors)
+
+
+def ingest_directory(directory, source="hospital_docs", chunk_size=200, overlap=40, embed_batch_size=256,
+                     upsert_batch_size=100, workers=4, checkpoint_path=DEFAULT_CHECKPOINT, text_field="text",
+                     retries=5):
+    """
+    Stream, chunk, embed and upsert every supported file under directory.
+
+    Returns:
+        dict: files/chunks processed, files skipped, elapsed seconds and chunks/sec.
+    """
+    index = get_index()
+    local_index = isinstance(index, LocalVectorIndex)
+    if local_index:
+        # Rewriting the matrix after every batch is quadratic; persist at checkpoints instead
+        index.autosave = False
+
+    checkpoint = load_checkpoint(checkpoint_path)
+    done_files = checkpoint.setdefault("files", {})
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+    max_in_flight = workers * 2
+    in_flight = deque()        # (batch_seq, future) in submission order
+    finished_files = deque()   # (last_batch_seq, relpath, signature) waiting for their batches
+    stats = {"files": 0, "skipped_files": 0, "chunks": 0}
+    batch, batch_seq = [], 0
+
+    def drain(block):
+        """Collect finished batches in order and checkpoint files whose batches all landed"""
+        completed_seq = None
+        while in_flight and (block or in_flight[0][1].done()):
+            seq, future = in_flight.popleft()
+            stats["chunks"] += future.result()
+            completed_seq = seq
+            block = block and len(in_flight) >= max_in_flight
+
+        if completed_seq is None:
+            return
+        newly_done = False
+        while finished_files and finished_files[0][0] <= completed_seq:
+            _, relpath, signature = finished_files.popleft()
+            done_files[relpath] = signature
+            newly_done = True
+        if newly_done:
+            if local_index:
+                index.persist()
+            save_checkpoint(checkpoint_path, checkpoint)
+
+    def submit():
+        nonlocal batch, batch_seq
+        if not batch:
+            return
+        in_flight.append((batch_seq, pool.submit(embed_and_upsert, index, batch, upsert_batch_size, retries)))
+        batch, batch_seq = [], batch_seq + 1
+        drain(block=len(in_flight) >= max_in_flight)
+
+    print(f"📥 Ingesting {directory} into {get_backend()} index "
+          f"(chunk={chunk_size}w/{overlap}w overlap, batch={embed_batch_size}, workers={workers})")
+    start = time.perf_counter()
+
+    try:
+        for path in iter_files(directory):
+            relpath = os.path.relpath(path, directory)
+            signature = file_signature(path)
+            if done_files.get(relpath) == signature:
+                stats["skipped_files"] += 1
+                continue
+
+            for record_number, (text, extra) in enumerate(iter_records(path, text_field)):
+                for chunk_number, chunk in enumerate(chunk_text(text, chunk_size, overlap)):
+                    metadata = {"text": chunk, "source": source, "file": relpath,
+                                "record": record_number, "chunk": chunk_number, **extra}
+                    batch.append((content_id(chunk, source, relpath), chunk, metadata))
+                    if len(batch) >= embed_batch_size:
+                        submit()
+
+            # The file is complete once the batch it ended in (possibly still open) lands
+            finished_files.append((batch_seq, relpath, signature))
+            stats["files"] += 1
+
+        submit()
+        while in_flight:
+            drain(block=True)
+        # Files whose chunks ended exactly on a batch boundary have nothing left in flight
+        while finished_files:
+            _, relpath, signature = finished_files.popleft()
+            done_files[relpath] = signature
+        if local_index:
+            index.persist()
+        save_checkpoint(checkpoint_path, checkpoint)
+    finally:
+        pool.shutdown(wait=True)
+
+    elapsed = time.perf_counter() - start
+    stats["elapsed_s"] = round(elapsed, 2)
+    stats["chunks_per_sec"] = round(stats["chunks"] / elapsed, 1) if elapsed > 0 else 0.0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest hospital documents into the vector index")
+    parser.add_argument("directory", help="Directory containing .txt, .md, .jsonl and .csv files")
+    parser.add_argument("--source", default="hospital_docs", help="Metadata source tag for the chunks")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Words per chunk")
+    parser.add_argument("--overlap", type=int, default=40, help="Words shared by consecutive chunks")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per embedding batch")
+    parser.add_argument("--upsert-batch-size", type=int, default=100, help="Vectors per upsert request")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent embed/upsert workers")
+    parser.add_argument("--text-field", default="text", help="Text column/key for jsonl and csv files")
+    parser.add_argument("--retries", type=int, default=5, help="Upsert retries before giving up")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Checkpoint file used to resume")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and re-ingest everything")
+    args = parser.parse_args()
+
+    if args.overlap >= args.chunk_size:
+        parser.error("--overlap must be smaller than --chunk-size")
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    stats = ingest_directory(
+        args.directory,
+        source=args.source,
+        chunk_size=args.chunk_size,
+        overlap=args.overlap,
+        embed_batch_size=args.batch_size,
+        upsert_batch_size=args.upsert_batch_size,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint,
+        text_field=args.text_field,
+        retries=args.retries,
+    )
+    print(f"✅ Ingested {stats['chunks']} chunks from {stats['files']} files "
+          f"({stats['skipped_files']} unchanged files skipped) in {stats['elapsed_s']}s "
+          f"→ {stats['chunks_per_sec']} chunks/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import sounddevice as sd
-import soundfile as sf
 import numpy as np
 import threading
 import queue
@@ -29,7 +28,7 @@ def audio_callback(indata, frames, time_info, status):
 def listen_continuously():
     """Continuously listen for audio input"""
     print("👂 Agent is continuously listening...")
-    with sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, callback=audio_callback, blocksize=BLOCK_SIZE):
+    with sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, dtype="float32", callback=audio_callback, blocksize=BLOCK_SIZE):
         while not stop_listening_event.is_set():
             sd.sleep(100)  # Small sleep to prevent busy-waiting
 
@@ -43,7 +42,7 @@ def stop_listening():
     stop_listening_event.set()
 
 def detect_voice_activity():
-    """Detect when user starts and stops speaking"""
+    """Detect when user starts and stops speaking; returns the speech as a 16 kHz float32 array"""
     frames = []
     speaking = False
     silence_start_time = None
@@ -96,13 +95,11 @@ def detect_voice_activity():
 
         time.sleep(0.01)  # Prevent busy-waiting
 
-    # Process recorded audio
+    # Hand the recording to STT as a float32 array; no WAV file is written
     if frames:
-        audio_np = np.concatenate(frames, axis=0)
-        filename = "recorded_speech.wav"
-        sf.write(filename, audio_np, SAMPLE_RATE)
-        print("✅ Speech recorded and saved.")
-        return filename
+        audio_np = np.concatenate(frames, axis=0).flatten()
+        print("✅ Speech recorded.")
+        return audio_np
 
     return None
 
@@ -0,0 +1,179 @@
+# load_test.py
+"""
+Load test the voice endpoint and measure how throughput scales with workers.
+
+Usage:
+    # Against a running server
+    python load_test.py clip.wav --url https://localhost:5000 --insecure
+
+    # Start gunicorn with 1, 2 and 4 workers in turn and compare
+    python load_test.py clip.wav --workers 1 2 4
+
+Every request uploads the same clip to /process_voice, so the measured work is
+decoding and Whisper transcription plus the reply. Without a GROQ_API_KEY the
+Groq client can't be created and every reply is the canned "unable to
+connect" message, whose audio the TTS cache pre-warms. The servers started
+by --workers leave the Groq client out of the warm-up (it is created on the
+first request instead), so they become ready either way.
+
+The --workers mode pins every worker to one PyTorch thread (--torch-threads)
+so each worker is one core, then reports requests per second, latency
+percentiles, speedup over the smallest worker count and scaling efficiency
+(speedup / worker ratio; 1.0 is perfectly linear).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from startup import WARMUP_COMPONENTS
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def send_clip(url, audio, verify):
+    """POST the clip once; returns (status code or None, latency in seconds)"""
+    start = time.perf_counter()
+    try:
+        response = requests.post(f"{url}/process_voice", files={"audio": ("clip.wav", audio, "audio/wav")},
+                                 verify=verify, timeout=300)
+        status = response.status_code
+    except requests.RequestException:
+        status = None
+    return status, time.perf_counter() - start
+
+
+def run_load(url, audio, concurrency, total_requests, verify=True):
+    """Send total_requests uploads from concurrency parallel clients and summarise the results"""
+    # Warm-up round so lazy initialisation doesn't count
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda _: send_clip(url, audio, verify), range(concurrency)))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda _: send_clip(url, audio, verify), range(total_requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for status, latency in results if status == 200]
+    return {
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "busy": sum(1 for status, _ in results if status == 503),
+        "errors": sum(1 for status, _ in results if status not in (200, 503)),
+        "duration_s": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_p50_ms": round(percentile(latencies, 0.5) * 1000) if latencies else None,
+        "latency_p95_ms": round(percentile(latencies, 0.95) * 1000) if latencies else None,
+        "latency_mean_ms": round(statistics.mean(latencies) * 1000) if latencies else None,
+    }
+
+
+def wait_until_ready(url, workers, timeout, server=None):
+    """Poll /health/ready until enough consecutive answers (from any worker) say ready"""
+    deadline = time.monotonic() + timeout
+    ready_in_a_row = 0
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            return False  # gunicorn exited during startup
+        try:
+            ready = requests.get(f"{url}/health/ready", timeout=5).status_code == 200
+        except requests.RequestException:
+            ready = False
+        ready_in_a_row = ready_in_a_row + 1 if ready else 0
+        if ready_in_a_row >= 3 * workers:
+            return True
+        time.sleep(0.5)
+    return False
+
+
+def start_server(workers, port, torch_threads):
+    # Without a GROQ_API_KEY the llm warm-up fails and /health/ready would never turn 200
+    warmup = ",".join(name for name in WARMUP_COMPONENTS if name != "llm")
+    env = dict(os.environ, WEB_WORKERS=str(workers), WEB_BIND=f"127.0.0.1:{port}",
+               TORCH_THREADS=str(torch_threads), SSL_CERT="", WARMUP_COMPONENTS=warmup)
+    return subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "run_server:app"],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def scaling_test(audio, worker_counts, port, torch_threads, concurrency, requests_per_worker, ready_timeout):
+    results = []
+    for workers in worker_counts:
+        print(f"⏳ Starting gunicorn with {workers} worker(s)...")
+        url = f"http://127.0.0.1:{port}"
+        server = start_server(workers, port, torch_threads)
+        try:
+            if not wait_until_ready(url, workers, ready_timeout, server):
+                print(f"❌ Server with {workers} worker(s) did not become ready")
+                continue
+            result = run_load(url, audio, concurrency or 2 * max(worker_counts),
+                              requests_per_worker * max(worker_counts))
+            result["workers"] = workers
+            results.append(result)
+            print(f"   {result['throughput_rps']} req/s, p50 {result['latency_p50_ms']}ms, "
+                  f"p95 {result['latency_p95_ms']}ms ({result['busy']} busy, {result['errors']} errors)")
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+
+    if results:
+        base = results[0]
+        for result in results:
+            speedup = result["throughput_rps"] / base["throughput_rps"] if base["throughput_rps"] else 0.0
+            result["speedup"] = round(speedup, 2)
+            result["efficiency"] = round(speedup / (result["workers"] / base["workers"]), 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /process_voice and measure multi-worker scaling")
+    parser.add_argument("audio", help="WAV clip to upload with every request")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="Server to test (ignored with --workers)")
+    parser.add_argument("--insecure", action="store_true", help="Accept the self-signed development certificate")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Parallel clients (default: 8, or twice the largest worker count with --workers)")
+    parser.add_argument("--requests", type=int, default=100, help="Requests to send against --url")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        help="Start gunicorn locally with each of these worker counts and compare throughput")
+    parser.add_argument("--port", type=int, default=5055, help="Port for the servers started by --workers")
+    parser.add_argument("--torch-threads", type=int, default=1, help="PyTorch threads per worker with --workers")
+    parser.add_argument("--requests-per-worker", type=int, default=20,
+                        help="Requests per worker of the largest configuration, with --workers")
+    parser.add_argument("--ready-timeout", type=float, default=600, help="Seconds to wait for model loading")
+    parser.add_argument("--output", help="Optional path to write the results as JSON")
+    args = parser.parse_args()
+
+    with open(args.audio, "rb") as file:
+        audio = file.read()
+
+    if args.workers:
+        results = scaling_test(audio, args.workers, args.port, args.torch_threads, args.concurrency,
+                               args.requests_per_worker, args.ready_timeout)
+        print(f"\n{'workers':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'speedup':>9}{'efficiency':>12}")
+        for result in results:
+            print(f"{result['workers']:>8}{result['throughput_rps']:>9.2f}{result['latency_p50_ms'] or 0:>9}"
+                  f"{result['latency_p95_ms'] or 0:>9}{result['speedup']:>9.2f}{result['efficiency']:>12.2f}")
+    else:
+        results = run_load(args.url.rstrip("/"), audio, args.concurrency or 8, args.requests,
+                           verify=not args.insecure)
+        print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"\n📝 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 # main.py
 
 from stt import transcribe
-from tts import speak
-from agent import get_response
-from memory import update_history, load_history,get_messages
+from tts import speak_stream, stop_speaking
+from agent import stream_response
+from memory import update_history, get_recent_history, get_messages, TAIL_SIZE
 from interrupt import start_interrupt_listener, interrupt_event
 from listener import start_listening, record_and_detect_speech
 import time
@@ -17,7 +17,8 @@ def run_agent():
     start_listening()
     start_interrupt_listener()
 
-    history = load_history()
+    # The prompt is built from the in-memory tail; the prompt builder trims it to the token budget
+    history = get_recent_history(TAIL_SIZE)
 
     print("👂 Agent is ready and listening continuously...")
     print("💬 Speak to start a conversation...")
@@ -25,27 +26,24 @@ def run_agent():
     while True:
         try:
             # Wait for speech detection
-            audio_file = record_and_detect_speech()
+            audio = record_and_detect_speech()
 
-            if audio_file:
-                # Transcribe the recorded speech
-                user_input = transcribe(audio_file)
+            if audio is not None:
+                # Transcribe the recorded speech straight from memory
+                user_input = transcribe(audio)
 
                 if user_input and user_input.strip():
                     print(f"🗣️ You: {user_input}")
 
                     # Update conversation history
                     update_history("user", user_input)
-                    history = load_history()
+                    history = get_recent_history(TAIL_SIZE)
 
-                    # Get response from agent
-                    response = get_response(history)
+                    # Stream the response from the agent, speaking each sentence as it arrives (can be interrupted)
+                    response = speak_with_interrupt_handling(stream_response(history))
                     update_history("assistant", response)
 
                     print(f"🤖 Dr. Assistant: {response}")
-
-                    # Speak response (can be interrupted)
-                    speak_with_interrupt_handling(response)
                 else:
                     print("🔇 No speech detected or transcription failed.")
 
@@ -60,11 +58,12 @@ def run_agent():
             time.sleep(1)  # Brief pause before retrying
 
 
-def speak_with_interrupt_handling(text):
-    """Speak text while monitoring for interruptions"""
+def speak_with_interrupt_handling(chunks):
+    """Speak streamed text while monitoring for interruptions; returns the full text"""
+    result = []
 
     def speak_thread():
-        speak(text)
+        result.append(speak_stream(chunks))
 
     # Start speaking in a separate thread
     speech_thread = threading.Thread(target=speak_thread, daemon=True)
@@ -74,10 +73,15 @@ def speak_with_interrupt_handling(text):
     while speech_thread.is_alive():
         if interrupt_event.is_set():
             print("⚠️ Speech interrupted by user")
+            stop_speaking()
             interrupt_event.clear()
             break
         time.sleep(0.1)
 
+    # The rest of the reply is still collected (silently) for the history
+    speech_thread.join()
+    return result[0] if result else ""
+
 
 if __name__ == "__main__":
     run_agent()
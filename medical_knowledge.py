@@ -1,18 +1,12 @@
 # medical_knowledge.py
-import uuid
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
-import os
 from dotenv import load_dotenv
+from embedding_service import encode
+import retrieval_cache
+from vector_store import get_index, get_backend, content_id, fetch_existing_ids, upsert_in_batches
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Pinecone and embedding model
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index(os.getenv("PINECONE_INDEX"))
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
 # Medical knowledge base for Clifton Hospital
 MEDICAL_KNOWLEDGE = [
     # Hospital Information
@@ -118,40 +112,66 @@ MEDICAL_KNOWLEDGE = [
     }
 ]
 
+KNOWLEDGE_SOURCE = "clifton_hospital_knowledge"
+
+
 def load_medical_knowledge():
-    """Load medical knowledge into Pinecone vector database"""
-    print("Loading medical knowledge into Pinecone...")
-    
-    for knowledge in MEDICAL_KNOWLEDGE:
-        # Generate embedding
-        embedding = model.encode(knowledge["text"]).tolist()
-        
-        # Create unique ID
-        knowledge_id = str(uuid.uuid4())
-        
-        # Upsert to Pinecone
-        index.upsert([
-            (knowledge_id, embedding, {
-                "text": knowledge["text"],
-                "category": knowledge["category"],
-                "source": "clifton_hospital_knowledge"
-            })
-        ])
-    
-    print(f"✅ Successfully loaded {len(MEDICAL_KNOWLEDGE)} medical knowledge entries into Pinecone")
+    """
+    Load medical knowledge into the vector database.
+
+    Entry IDs are content hashes, so entries that are already indexed are
+    skipped and a restart with unchanged knowledge makes no writes.
+    """
+    index = get_index()
+    print(f"Loading medical knowledge into {get_backend()} index...")
+
+    ids = [content_id(knowledge["text"], KNOWLEDGE_SOURCE, knowledge["category"])
+           for knowledge in MEDICAL_KNOWLEDGE]
+    existing_ids = fetch_existing_ids(index, ids)
+    pending = [(knowledge_id, knowledge) for knowledge_id, knowledge in zip(ids, MEDICAL_KNOWLEDGE)
+               if knowledge_id not in existing_ids]
+
+    if not pending:
+        print(f"✅ Medical knowledge already indexed ({len(MEDICAL_KNOWLEDGE)} entries), nothing to upload")
+        return
+
+    # Generate all embeddings in one batched call
+    embeddings = encode([knowledge["text"] for _, knowledge in pending])
+
+    vectors = [
+        (knowledge_id, embedding.tolist(), {
+            "text": knowledge["text"],
+            "category": knowledge["category"],
+            "source": KNOWLEDGE_SOURCE
+        })
+        for (knowledge_id, knowledge), embedding in zip(pending, embeddings)
+    ]
+    upsert_in_batches(index, vectors)
+
+    print(f"✅ Successfully loaded {len(vectors)} new medical knowledge entries into {get_backend()} index "
+          f"({len(existing_ids)} already present)")
+
+    # Cached context strings may now be stale
+    retrieval_cache.invalidate()
+
+def search_medical_knowledge(query, top_k=3, query_embedding=None):
+    """Search medical knowledge base for relevant information
 
-def search_medical_knowledge(query, top_k=3):
-    """Search medical knowledge base for relevant information"""
+    Pass a precomputed ``query_embedding`` to skip re-encoding the query.
+    """
     try:
-        # Generate query embedding
-        query_embedding = model.encode(query).tolist()
+        # Generate query embedding unless the caller already has one
+        if query_embedding is None:
+            query_embedding = encode([query])[0]
+        if not isinstance(query_embedding, list):
+            query_embedding = query_embedding.tolist()
         
-        # Search in Pinecone
-        results = index.query(
+        # Search the vector index
+        results = get_index().query(
             vector=query_embedding,
             top_k=top_k,
             include_metadata=True,
-            filter={"source": "clifton_hospital_knowledge"}
+            filter={"source": KNOWLEDGE_SOURCE}
         )
         
         # Extract relevant information
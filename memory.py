@@ -1,10 +1,92 @@
 # memory.py
 import json
 import os
+import threading
+from collections import deque
 from datetime import datetime
 
-# ✅ Define the conversation log file path
-LOG_FILE = "conversation_log.json"
+# ✅ Define the conversation log file path (append-only JSON Lines, one message per line)
+LOG_FILE = "conversation_log.jsonl"
+
+# Older versions rewrote the whole history into this JSON file on every message
+LEGACY_LOG_FILE = "conversation_log.json"
+
+# Number of recent messages kept in memory so typical reads never touch the disk
+TAIL_SIZE = int(os.getenv("MEMORY_TAIL_SIZE", "200"))
+
+# Compaction keeps the newest MAX_HISTORY_MESSAGES once the log grows past twice that
+MAX_HISTORY_MESSAGES = int(os.getenv("MEMORY_MAX_MESSAGES", "2000"))
+
+_lock = threading.RLock()
+_tail = deque(maxlen=TAIL_SIZE)
+_message_count = 0
+_line_count = 0
+_loaded = False
+
+
+def _read_log():
+    """Read every valid message from the log, skipping partial or corrupt lines."""
+    messages = []
+    lines = 0
+    if not os.path.exists(LOG_FILE):
+        return messages, lines
+
+    try:
+        with open(LOG_FILE, "r", encoding="utf-8") as file:
+            for line in file:
+                lines += 1
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # e.g. a line cut short by a crash mid-append
+                if isinstance(message, dict) and "role" in message and "content" in message:
+                    messages.append(message)
+    except IOError:
+        print("⚠️ Could not read conversation history.")
+
+    return messages, lines
+
+
+def _write_log(messages):
+    """Atomically replace the log with the given messages."""
+    tmp_file = LOG_FILE + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as file:
+        for message in messages:
+            file.write(json.dumps(message) + "\n")
+    os.replace(tmp_file, LOG_FILE)
+
+
+def _migrate_legacy_log():
+    """Convert the old single-JSON-array log into the JSONL log, keeping a backup."""
+    try:
+        with open(LEGACY_LOG_FILE, "r", encoding="utf-8") as file:
+            history = json.load(file)
+    except (json.JSONDecodeError, IOError):
+        return
+
+    if isinstance(history, list):
+        _write_log([msg for msg in history if isinstance(msg, dict)])
+        os.replace(LEGACY_LOG_FILE, LEGACY_LOG_FILE + ".bak")
+        print(f"✅ Migrated {len(history)} messages from {LEGACY_LOG_FILE} to {LOG_FILE}")
+
+
+def _ensure_loaded():
+    global _message_count, _line_count, _loaded
+
+    if _loaded:
+        return
+
+    with _lock:
+        if _loaded:
+            return
+        if not os.path.exists(LOG_FILE) and os.path.exists(LEGACY_LOG_FILE):
+            _migrate_legacy_log()
+
+        messages, _line_count = _read_log()
+        _message_count = len(messages)
+        _tail.clear()
+        _tail.extend(messages)
+        _loaded = True
 
 
 def load_history():
@@ -14,18 +96,28 @@ def load_history():
     Returns:
         list: A list of message dictionaries with role and content.
     """
-    if not os.path.exists(LOG_FILE):
-        return []
+    _ensure_loaded()
 
-    try:
-        with open(LOG_FILE, "r", encoding="utf-8") as file:
-            history = json.load(file)
-            if isinstance(history, list):
-                return history
-    except (json.JSONDecodeError, IOError):
-        pass
+    with _lock:
+        # Served from memory unless the history is longer than the cached tail
+        if _message_count <= len(_tail):
+            return list(_tail)
 
-    return []
+    messages, _ = _read_log()
+    return messages
+
+
+def get_recent_history(limit):
+    """
+    Return up to the last `limit` messages without reading the log file
+    (limited to the MEMORY_TAIL_SIZE most recent messages).
+    """
+    _ensure_loaded()
+
+    with _lock:
+        if limit <= 0:
+            return []
+        return list(_tail)[-limit:]
 
 
 def update_history(role, content):
@@ -36,17 +128,49 @@ def update_history(role, content):
         role (str): 'user' or 'assistant'
         content (str): Message text content
     """
-    history = load_history()
-    history.append({
+    global _message_count, _line_count
+
+    _ensure_loaded()
+    message = {
         "role": role,
         "content": content,
-    })
+    }
 
-    try:
-        with open(LOG_FILE, "w", encoding="utf-8") as file:
-            json.dump(history, file, indent=2)
-    except IOError:
-        print("⚠️ Could not save conversation history.")
+    with _lock:
+        try:
+            with open(LOG_FILE, "a", encoding="utf-8") as file:
+                file.write(json.dumps(message) + "\n")
+        except IOError:
+            print("⚠️ Could not save conversation history.")
+            return
+
+        _tail.append(message)
+        _message_count += 1
+        _line_count += 1
+
+        if _line_count > 2 * MAX_HISTORY_MESSAGES:
+            compact_history()
+
+
+def compact_history(max_messages=MAX_HISTORY_MESSAGES):
+    """
+    Rewrite the log keeping only the newest `max_messages` valid messages,
+    dropping any corrupt lines.
+    """
+    global _message_count, _line_count
+
+    with _lock:
+        messages, _ = _read_log()
+        messages = messages[-max_messages:] if max_messages > 0 else []
+        try:
+            _write_log(messages)
+        except IOError:
+            print("⚠️ Could not compact conversation history.")
+            return
+
+        _message_count = _line_count = len(messages)
+        _tail.clear()
+        _tail.extend(messages)
 
 
 def get_messages():
@@ -61,8 +185,16 @@ def clear_history():
     """
     Clear the entire conversation history by resetting the log file.
     """
-    try:
-        with open(LOG_FILE, "w", encoding="utf-8") as file:
-            json.dump([], file)
-    except IOError:
-        print("⚠️ Could not clear conversation history.")
+    global _message_count, _line_count, _loaded
+
+    with _lock:
+        try:
+            with open(LOG_FILE, "w", encoding="utf-8"):
+                pass
+        except IOError:
+            print("⚠️ Could not clear conversation history.")
+            return
+
+        _tail.clear()
+        _message_count = _line_count = 0
+        _loaded = True
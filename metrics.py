@@ -0,0 +1,189 @@
+# metrics.py
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# === Configuration ===
+# Expose counters and latency histograms at /metrics in the Prometheus text format
+METRICS_ENDPOINT = os.getenv("METRICS_ENDPOINT", "1") == "1"
+# Add a per-stage timing breakdown to every voice response (also per request with ?timings=1)
+METRICS_RESPONSE_TIMINGS = os.getenv("METRICS_RESPONSE_TIMINGS", "0") == "1"
+
+# Histogram bucket upper bounds in seconds, from dictionary lookups up to long Whisper decodes
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+_lock = threading.Lock()
+_stages = {}  # stage -> {"buckets": [count per bucket], "count", "errors", "sum"}
+_requests = {}  # (endpoint, status) -> count
+_request_timings = ContextVar("request_timings", default=None)
+
+
+def _new_histogram():
+    return {"buckets": [0] * len(BUCKETS), "count": 0, "errors": 0, "sum": 0.0}
+
+
+def record(stage, seconds, error=False):
+    """Add one observation of stage to its histogram and to the current request's breakdown"""
+    breakdown = _request_timings.get()
+    with _lock:
+        histogram = _stages.setdefault(stage, _new_histogram())
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+                break
+        histogram["count"] += 1
+        histogram["sum"] += seconds
+        if error:
+            histogram["errors"] += 1
+
+        if breakdown is not None:
+            # A stage can run several times per request (one TTS call per sentence), so sum them.
+            # Updated under the lock: the TTS and retrieval threads write into the same breakdown
+            key = f"{stage}_ms"
+            breakdown[key] = breakdown.get(key, 0.0) + seconds * 1000
+
+
+@contextmanager
+def timed(stage):
+    """Time the enclosed block as one call of stage; an exception counts as an error"""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        # A client disconnecting mid-stream is not a failure of the stage
+        record(stage, time.perf_counter() - start, error=not isinstance(e, GeneratorExit))
+        raise
+    record(stage, time.perf_counter() - start)
+
+
+def instrumented(stage):
+    """Decorator timing every call of the function as stage"""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def track_request(enabled=True):
+    """
+    Collect the stage timings of the calls made while handling one request.
+
+    Yields the breakdown dict ({stage}_ms -> milliseconds), filled in as
+    instrumented stages complete, or None when not enabled. Work handed to
+    other threads only lands in the breakdown when it runs in a copy of the
+    request's context (contextvars.copy_context().run), as the retrieval pool
+    and SentencePipeline do.
+    """
+    if not enabled:
+        yield None
+        return
+    breakdown = {}
+    _request_timings.set(breakdown)
+    try:
+        yield breakdown
+    finally:
+        _request_timings.set(None)
+
+
+def request_breakdown():
+    """The current request's stage timings rounded to 0.1 ms, or None if it isn't tracked"""
+    breakdown = _request_timings.get()
+    return {stage: round(ms, 1) for stage, ms in breakdown.items()} if breakdown is not None else None
+
+
+def count_request(endpoint, status):
+    with _lock:
+        _requests[(endpoint, status)] = _requests.get((endpoint, status), 0) + 1
+
+
+def _quantile_ms(histogram, fraction):
+    """Upper bound of the bucket holding the given quantile (None when it is the +Inf bucket)"""
+    target = histogram["count"] * fraction
+    seen = 0
+    for bound, count in zip(BUCKETS, histogram["buckets"]):
+        seen += count
+        if seen >= target:
+            return None if bound == float("inf") else round(bound * 1000, 1)
+    return None
+
+
+def get_stats():
+    """Per-stage call counts, error rates and latency (p50/p95 are histogram bucket upper bounds)"""
+    with _lock:
+        stages = {name: dict(histogram, buckets=list(histogram["buckets"])) for name, histogram in _stages.items()}
+    return {
+        name: {
+            "count": histogram["count"],
+            "errors": histogram["errors"],
+            "error_rate": round(histogram["errors"] / histogram["count"], 4) if histogram["count"] else 0.0,
+            "mean_ms": round(histogram["sum"] / histogram["count"] * 1000, 1) if histogram["count"] else None,
+            "p50_ms": _quantile_ms(histogram, 0.5),
+            "p95_ms": _quantile_ms(histogram, 0.95),
+        }
+        for name, histogram in sorted(stages.items())
+    }
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def render_prometheus(gauges=None):
+    """
+    Render every metric in the Prometheus text exposition format.
+
+    Args:
+        gauges (dict, optional): Extra point-in-time values, name -> number.
+
+    Under gunicorn each worker process keeps and reports its own metrics.
+    """
+    with _lock:
+        stages = {name: dict(histogram, buckets=list(histogram["buckets"])) for name, histogram in _stages.items()}
+        requests = dict(_requests)
+
+    lines = [
+        "# HELP clifton_stage_duration_seconds Latency of each pipeline stage.",
+        "# TYPE clifton_stage_duration_seconds histogram",
+    ]
+    for name, histogram in sorted(stages.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS, histogram["buckets"]):
+            cumulative += count
+            lines.append(f'clifton_stage_duration_seconds_bucket{{stage="{name}",le="{_format_bound(bound)}"}} '
+                         f"{cumulative}")
+        lines.append(f'clifton_stage_duration_seconds_sum{{stage="{name}"}} {histogram["sum"]:.6f}')
+        lines.append(f'clifton_stage_duration_seconds_count{{stage="{name}"}} {histogram["count"]}')
+
+    lines += [
+        "# HELP clifton_stage_errors_total Calls of each pipeline stage that raised.",
+        "# TYPE clifton_stage_errors_total counter",
+    ]
+    for name, histogram in sorted(stages.items()):
+        lines.append(f'clifton_stage_errors_total{{stage="{name}"}} {histogram["errors"]}')
+
+    lines += [
+        "# HELP clifton_http_requests_total HTTP responses by endpoint and status code.",
+        "# TYPE clifton_http_requests_total counter",
+    ]
+    for (endpoint, status), count in sorted(requests.items()):
+        lines.append(f'clifton_http_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+    for name, value in sorted((gauges or {}).items()):
+        lines.append(f"# TYPE clifton_{name} gauge")
+        lines.append(f"clifton_{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,130 @@
+# prompt_builder.py
+import os
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# === Configuration ===
+# llama3-8b-8192 has an 8192-token window; the rest is left for the 1024-token reply
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "300"))
+
+# Rough per-message overhead for role markers in the chat template
+MESSAGE_OVERHEAD_TOKENS = 4
+
+URGENT_NOTICE = ("⚠️ URGENT: This appears to be a medical emergency. "
+                 "Prioritize immediate medical attention in your response.")
+
+# Use a real BPE tokenizer when tiktoken is installed, otherwise estimate
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+
+def count_tokens(text):
+    """Count (or estimate, ~4 characters per token) the tokens in text"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(len(text) // 4, len(text.split()))
+
+
+def message_tokens(message):
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Trim text so it fits in max_tokens, cutting at a line or word boundary"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    if _encoding is not None:
+        text = _encoding.decode(_encoding.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        text = text[:max_tokens * 4]
+    cut = max(text.rfind("\n"), text.rfind(" "))
+    return (text[:cut] if cut > 0 else text).rstrip() + " …"
+
+
+def dedupe_history(history):
+    """Drop messages that exactly repeat the one before them (same role and content)"""
+    deduped = []
+    for message in history:
+        message = {"role": message["role"], "content": message["content"]}
+        if deduped and deduped[-1] == message:
+            continue
+        deduped.append(message)
+    return deduped
+
+
+def summarize_turns(turns, max_tokens=SUMMARY_TOKEN_BUDGET):
+    """
+    Build a compact extractive summary of older turns that no longer fit.
+
+    Keeps the gist of what the patient said (most recent first) so details like
+    their name or symptoms survive once the full turns are dropped.
+    """
+    lines = []
+    used = count_tokens("Summary of earlier conversation:")
+    for message in reversed(turns):
+        if message["role"] != "user":
+            continue
+        line = "- Patient: " + truncate_to_tokens(" ".join(message["content"].split()), 60)
+        line_tokens = count_tokens(line)
+        if used + line_tokens > max_tokens:
+            break
+        lines.append(line)
+        used += line_tokens
+
+    if not lines:
+        return ""
+    return "Summary of earlier conversation:\n" + "\n".join(reversed(lines))
+
+
+def build_messages(history, system_prompt, context="", is_urgent=False, budget=PROMPT_TOKEN_BUDGET):
+    """
+    Assemble the chat messages for one LLM request within a token budget.
+
+    Priority order: system prompt, urgency flag, retrieved context, then the
+    most recent conversation turns. Older turns that don't fit are replaced by
+    a short summary. The latest message is always kept.
+
+    Returns:
+        tuple: (messages, total_token_count, dropped_turn_count)
+    """
+    messages = [{"role": "system", "content": system_prompt}]
+    if context:
+        context = truncate_to_tokens(context, CONTEXT_TOKEN_BUDGET)
+        messages.append({"role": "system", "content": f"Relevant Information:\n{context}"})
+    if is_urgent:
+        messages.append({"role": "system", "content": URGENT_NOTICE})
+
+    used = sum(message_tokens(message) for message in messages)
+    turns = dedupe_history(history)
+
+    # Walk back from the newest turn, keeping as many as fit (reserving room for a summary)
+    remaining = budget - used - SUMMARY_TOKEN_BUDGET
+    kept = []
+    for message in reversed(turns):
+        tokens = message_tokens(message)
+        if kept and tokens > remaining:
+            break
+        kept.append(message)
+        remaining -= tokens
+    kept.reverse()
+
+    dropped = turns[:len(turns) - len(kept)]
+    if dropped:
+        summary = summarize_turns(dropped)
+        if summary:
+            messages.append({"role": "system", "content": summary})
+
+    messages.extend(kept)
+    total = sum(message_tokens(message) for message in messages)
+    return messages, total, len(dropped)
@@ -1,108 +1,338 @@
 # run_server.py
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file, g, stream_with_context
 from werkzeug.utils import secure_filename
 import os
-import tempfile
 import json
+import time
 from datetime import datetime
 
-# Import our modules
-from stt import transcribe
-from tts import speak
-from agent import get_response
-from memory import update_history, load_history
+# Import our modules (models are loaded lazily or by the warm-up thread, not at import)
+from startup import loading, exclusive, mark_imported, preload, start_warmup, is_ready, get_report as get_startup_report
+from stt import transcribe, get_backend as get_stt_backend, get_stats as get_stt_stats
+from audio_io import from_pcm, get_stats as get_audio_decode_stats
+from streaming_stt import StreamingTranscriber
+from tts import get_tts_model
+from agent import get_response, stream_response, get_groq_client, NO_CLIENT_RESPONSE, ERROR_RESPONSE
+from tts_pipeline import SentencePipeline, get_stats as get_tts_pipeline_stats
+from tts_cache import tts_cache, load_phrases
+from audio_store import audio_store
+from audio_encoding import encoded_variant, negotiate as negotiate_audio_format, get_stats as get_audio_encoding_stats
+from scheduler import scheduler, stage, ServerBusy
+from metrics import (timed, track_request, request_breakdown, count_request, render_prometheus,
+                     get_stats as get_stage_stats, METRICS_ENDPOINT, METRICS_RESPONSE_TIMINGS)
+from session_memory import session_store, new_session_id, is_valid_session_id
 from medical_knowledge import load_medical_knowledge
+from embedding_service import get_model as get_embedding_model, get_stats as get_embedding_stats
+from retrieval_cache import get_stats as get_retrieval_cache_stats
+from triage import get_centroids as get_triage_centroids
+from vector_store import get_index, get_backend as get_vector_backend
 
 app = Flask(__name__)
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB max file size
 
-# Global variables
-is_processing = False
+# WebSocket support for streaming speech recognition is optional (pip install flask-sock)
+try:
+    from flask_sock import Sock
+    from simple_websocket import ConnectionClosed
+
+    sock = Sock(app)
+except ImportError:
+    sock = None
+    print("⚠️ flask-sock not installed; streaming speech recognition (/ws/voice) is disabled")
+
+# Startup breakdown: time spent importing before any model is loaded
+mark_imported()
+
+SESSION_COOKIE = "session_id"
+AUDIO_CACHE_MAX_AGE = 24 * 3600  # seconds browsers may reuse cached TTS phrases
+
+
+def get_session_id():
+    """Return the caller's session ID from the cookie or X-Session-ID header, creating one if needed"""
+    if "session_id" not in g:
+        session_id = request.cookies.get(SESSION_COOKIE) or request.headers.get("X-Session-ID")
+        if not is_valid_session_id(session_id):
+            session_id = new_session_id()
+            g.new_session = True
+        g.session_id = session_id
+    return g.session_id
+
+
+@app.after_request
+def set_session_cookie(response):
+    """Hand newly created session IDs back to the browser"""
+    if g.get("new_session"):
+        response.set_cookie(SESSION_COOKIE, g.session_id, max_age=30 * 24 * 3600,
+                            httponly=True, samesite="Lax", secure=request.is_secure)
+    return response
+
+
+@app.after_request
+def count_response(response):
+    """Count responses per endpoint and status for /metrics"""
+    count_request(request.endpoint or "unknown", response.status_code)
+    return response
+
+
+def wants_timings():
+    """Whether to add the per-stage timing breakdown to this voice response"""
+    return METRICS_RESPONSE_TIMINGS or request.args.get("timings") == "1"
+
+
+def busy_response(busy):
+    """503 back-pressure reply carrying the queue position and a Retry-After hint"""
+    response = jsonify({
+        "error": "Server is busy, please retry shortly",
+        "queue_position": busy.queue_position,
+        "retry_after": busy.retry_after
+    })
+    response.status_code = 503
+    response.headers["Retry-After"] = str(busy.retry_after)
+    return response
 
 
 @app.route("/")
 def index():
     """Serve the main chat interface"""
+    # Issue the session cookie with the page: the /ws/voice handshake can't set one
+    # (after_request never reaches a 101 response), so the socket must arrive with it
+    get_session_id()
     return render_template("index.html")
 
 
 @app.route("/process_voice", methods=["POST"])
 def process_voice():
     """Process voice input from the web interface"""
-    global is_processing
+    # Get audio file from request
+    if "audio" not in request.files:
+        return jsonify({"error": "No audio file provided"}), 400
 
-    if is_processing:
-        return jsonify({"error": "Already processing audio"}), 429
+    audio_file = request.files["audio"]
+    if audio_file.filename == "":
+        return jsonify({"error": "No audio file selected"}), 400
 
+    # Wait for a free worker slot, or tell the client when to retry
+    queue_start = time.perf_counter()
     try:
-        is_processing = True
+        with timed("queue_wait"):
+            slot = scheduler.acquire()
+    except ServerBusy as busy:
+        return busy_response(busy)
 
-        # Get audio file from request
-        if "audio" not in request.files:
-            return jsonify({"error": "No audio file provided"}), 400
+    request_start = time.perf_counter()
+    try:
+        with track_request(wants_timings()) as breakdown:
+            if breakdown is not None:
+                breakdown["queue_wait_ms"] = (request_start - queue_start) * 1000
+            return process_voice_turn(audio_file, breakdown, request_start)
 
-        audio_file = request.files["audio"]
-        if audio_file.filename == "":
-            return jsonify({"error": "No audio file selected"}), 400
+    except Exception as e:
+        print(f"Error processing voice: {e}")
+        return jsonify({"error": "Failed to process voice input"}), 500
 
-        # Save audio file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-            audio_file.save(tmp_file.name)
-            temp_audio_path = tmp_file.name
+    finally:
+        scheduler.release(slot)
 
-        # Transcribe audio
-        user_input = transcribe(temp_audio_path)
 
-        # Clean up temp file
-        os.unlink(temp_audio_path)
+def process_voice_turn(audio_file, breakdown, request_start):
+    """Transcribe, answer and synthesize one /process_voice request"""
+    # Transcribe audio
+    user_input = transcribe_upload(audio_file)
 
-        if not user_input or not user_input.strip():
-            return jsonify({"error": "No speech detected"}), 400
+    if not user_input or not user_input.strip():
+        return jsonify({"error": "No speech detected"}), 400
 
-        # Update conversation history
-        update_history("user", user_input)
-        history = load_history()
+    # Update this session's conversation history
+    session_id = get_session_id()
+    session_store.append(session_id, "user", user_input)
+    history = session_store.get_history(session_id)
 
-        # Get AI response
+    # Get AI response
+    with stage("llm"):
         assistant_response = get_response(history)
-        update_history("assistant", assistant_response)
+    session_store.append(session_id, "assistant", assistant_response)
 
-        # Generate TTS audio
-        tts_filename = f'response_{datetime.now().strftime("%Y%m%d_%H%M%S")}.wav'
-        tts_path = os.path.join(tempfile.gettempdir(), tts_filename)
+    # Generate TTS audio
+    audio_url = synthesize_response(assistant_response)
 
-        # Create TTS audio file
-        try:
-            speak_to_file(assistant_response, tts_path)
-            audio_url = f"/audio/{tts_filename}"
-        except Exception as e:
-            print(f"TTS Error: {e}")
-            audio_url = None
+    result = {
+        "user_input": user_input,
+        "assistant_response": assistant_response,
+        "audio_url": audio_url,
+        "timestamp": datetime.now().isoformat()
+    }
+    if breakdown is not None:
+        # Which stage made this turn slow: stt, retrieval, llm, tts, history I/O, ...
+        result["timings"] = dict(request_breakdown(), total_ms=round((time.perf_counter() - request_start) * 1000, 1))
+    return jsonify(result)
+
+
+@app.route("/process_voice_stream", methods=["POST"])
+def process_voice_stream():
+    """
+    Process voice input and stream the reply as server-sent events.
+
+    Events: ``transcript`` (user_input), ``token`` (text chunk as generated by
+    the LLM), ``audio`` (URL of the next synthesized sentence, in order),
+    ``done`` (full reply, audio segment URLs and timings) or ``error``.
+    """
+    if "audio" not in request.files:
+        return jsonify({"error": "No audio file provided"}), 400
+
+    audio_file = request.files["audio"]
+    if audio_file.filename == "":
+        return jsonify({"error": "No audio file selected"}), 400
 
-        return jsonify({
-            "user_input": user_input,
-            "assistant_response": assistant_response,
-            "audio_url": audio_url,
-            "timestamp": datetime.now().isoformat()
-        })
+    request_start = time.perf_counter()
+    session_id = get_session_id()
 
+    # Wait for a free worker slot; it is held until the stream finishes
+    try:
+        with timed("queue_wait"):
+            slot = scheduler.acquire()
+    except ServerBusy as busy:
+        return busy_response(busy)
+    queue_wait_ms = (time.perf_counter() - request_start) * 1000
+
+    # The upload is closed once this view returns, so read it before streaming
+    try:
+        audio_bytes = read_upload(audio_file)
     except Exception as e:
-        print(f"Error processing voice: {e}")
+        scheduler.release(slot)
+        print(f"Error reading audio: {e}")
         return jsonify({"error": "Failed to process voice input"}), 500
+    include_timings = wants_timings()
 
-    finally:
-        is_processing = False
+    def generate():
+        try:
+            with track_request(include_timings):
+                # Timed from here: waiting for the slot is reported separately as queue_wait_ms
+                stt_start = time.perf_counter()
+                user_input = transcribe_audio(audio_bytes)
+                if not user_input or not user_input.strip():
+                    yield sse("error", {"error": "No speech detected"})
+                    return
+                yield sse("transcript", {"user_input": user_input})
+
+                timings = {"queue_wait_ms": queue_wait_ms, "stt_ms": (time.perf_counter() - stt_start) * 1000}
+                yield from reply_events(session_id, user_input, request_start, timings, sse)
+
+        except Exception as e:
+            print(f"Error streaming voice response: {e}")
+            yield sse("error", {"error": "Failed to process voice input"})
+
+        finally:
+            scheduler.release(slot)
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def voice_socket(ws):
+    """
+    Streaming speech recognition over a WebSocket.
+
+    The client sends binary frames of 16-bit mono PCM while the user speaks
+    (16 kHz unless a ``{"sample_rate": N}`` text message says otherwise) and
+    may send ``{"end": true}`` to finalize early. The server replies with
+    JSON ``{"event", "data"}`` messages: ``speech_start``, ``partial`` (text
+    so far), ``transcript`` (final user_input) and then the same ``token``,
+    ``audio`` and ``done`` events as /process_voice_stream. Clients pause
+    sending audio between ``transcript`` and ``done``. A malformed text
+    message is answered with an ``error`` event and otherwise ignored.
+    """
+    session_id = get_session_id()
+    include_timings = wants_timings()
+    sample_rate = 16000
+    stream = StreamingTranscriber(transcribe_audio)
+
+    def message(event, data):
+        return json.dumps({"event": event, "data": data})
+
+    try:
+        while True:
+            frame = ws.receive()
+            if isinstance(frame, str):
+                # A malformed control message is reported, not allowed to close the socket
+                try:
+                    control = json.loads(frame)
+                    rate = int(control.get("sample_rate", sample_rate))
+                    if rate <= 0:
+                        raise ValueError(f"Invalid sample rate {rate}")
+                except (ValueError, TypeError, AttributeError) as e:
+                    ws.send(message("error", {"error": f"Malformed control message: {e}"}))
+                    continue
+                sample_rate = rate
+                events = stream.flush() if control.get("end") else []
+            else:
+                events = stream.feed(from_pcm(frame, sample_rate))
+
+            for event, data in events:
+                ws.send(message(event, data))
+                if event != "transcript":
+                    continue
+                if not data["user_input"]:
+                    ws.send(message("error", {"error": "No speech detected"}))
+                    continue
+
+                # Speech has ended: the reply needs a worker slot like any other request
+                try:
+                    with timed("queue_wait"):
+                        slot = scheduler.acquire()
+                except ServerBusy as busy:
+                    ws.send(message("busy", {"queue_position": busy.queue_position,
+                                             "retry_after": busy.retry_after}))
+                    continue
+                try:
+                    timings = {"stt_finalize_ms": data["finalize_ms"]}
+                    with track_request(include_timings):
+                        for reply in reply_events(session_id, data["user_input"], time.perf_counter(),
+                                                  timings, message):
+                            ws.send(reply)
+                except ConnectionClosed:
+                    raise
+                except Exception as e:
+                    print(f"Error streaming voice response: {e}")
+                    ws.send(message("error", {"error": "Failed to process voice input"}))
+                finally:
+                    scheduler.release(slot)
+    except ConnectionClosed:
+        pass
+
+
+if sock is not None:
+    sock.route("/ws/voice")(voice_socket)
 
 
 @app.route("/audio/<filename>")
 def serve_audio(filename):
-    """Serve generated TTS audio files"""
+    """
+    Serve generated TTS audio files.
+
+    The format comes from ?format=opus|mp3|wav or the Accept header; compressed
+    variants are encoded on first request and reused. Range requests and
+    ETag revalidation are handled by send_file.
+    """
     try:
-        audio_path = os.path.join(tempfile.gettempdir(), secure_filename(filename))
-        if os.path.exists(audio_path):
-            return send_file(audio_path, mimetype="audio/wav")
-        else:
+        filename = secure_filename(filename)
+        # Cached phrases are served straight from the TTS cache, everything else from the audio store
+        cached_path = tts_cache.lookup(filename)
+        audio_path = cached_path or audio_store.lookup(filename)
+        if not audio_path:
             return jsonify({"error": "Audio file not found"}), 404
+
+        audio_format = negotiate_audio_format(request.accept_mimetypes, request.args.get("format"))
+        audio_path, mimetype = encoded_variant(audio_path, audio_format)
+
+        # Files never change once written: cache hits are content-addressed and
+        # reply audio has a unique name that lives for AUDIO_TTL
+        response = send_file(audio_path, mimetype=mimetype, conditional=True, etag=True,
+                             max_age=AUDIO_CACHE_MAX_AGE if cached_path else int(audio_store.ttl))
+        response.cache_control.public = False
+        response.cache_control.private = True
+        response.cache_control.immutable = True
+        response.vary.add("Accept")
+        return response
     except Exception as e:
         print(f"Error serving audio: {e}")
         return jsonify({"error": "Failed to serve audio"}), 500
@@ -110,9 +340,9 @@ def serve_audio(filename):
 
 @app.route("/chat_history")
 def get_chat_history():
-    """Get conversation history"""
+    """Get the caller's conversation history"""
     try:
-        history = load_history()
+        history = session_store.get_history(get_session_id())
         return jsonify({"history": history})
     except Exception as e:
         print(f"Error getting chat history: {e}")
@@ -121,69 +351,286 @@ def get_chat_history():
 
 @app.route("/clear_history", methods=["POST"])
 def clear_chat_history():
-    """Clear conversation history"""
+    """Clear the caller's conversation history"""
     try:
-        # Clear the conversation log
-        with open("aaconversation_log.json", "w") as f:
-            json.dump([], f)
+        session_store.clear(get_session_id())
         return jsonify({"success": True})
     except Exception as e:
         print(f"Error clearing history: {e}")
         return jsonify({"error": "Failed to clear history"}), 500
 
 
+@app.route("/health/live")
+def liveness_check():
+    """Liveness: the process is up and serving requests (models may still be loading)"""
+    return jsonify({"status": "alive", "uptime_s": get_startup_report()["uptime_s"]})
+
+
+@app.route("/health/ready")
+def readiness_check():
+    """Readiness: required models are loaded, so requests won't stall on a cold start"""
+    report = get_startup_report()
+    if is_ready():
+        return jsonify({"status": "ready", "startup": report})
+    return jsonify({"status": "starting", "startup": report}), 503
+
+
 @app.route("/health")
 def health_check():
     """Health check endpoint"""
     return jsonify({
         "status": "healthy",
+        "ready": is_ready(),
+        "startup": get_startup_report(),
         "service": "Clifton Hospital Voice Assistant",
+        "embedding_model": get_embedding_stats(),
+        "retrieval_cache": get_retrieval_cache_stats(),
+        "vector_backend": get_vector_backend(),
+        "sessions": session_store.stats(),
+        "tts_pipeline": get_tts_pipeline_stats(),
+        "tts_cache": tts_cache.stats(),
+        "audio_store": audio_store.stats(),
+        "audio_encoding": get_audio_encoding_stats(),
+        "scheduler": scheduler.stats(),
+        "stt_batching": get_stt_stats(),
+        "audio_decode": get_audio_decode_stats(),
+        "stages": get_stage_stats(),
         "timestamp": datetime.now().isoformat()
     })
 
 
-def speak_to_file(text, filepath):
-    """Generate TTS audio and save to file"""
+def metrics_endpoint():
+    """Prometheus scrape target: per-stage latency histograms, error counts and load gauges"""
+    scheduler_stats = scheduler.stats()
+    cache_stats = tts_cache.stats()
+    gauges = {
+        "active_requests": scheduler_stats["active"],
+        "queued_requests": scheduler_stats["queued"],
+        "rejected_requests": scheduler_stats["rejected"],
+        "active_sessions": session_store.stats()["active_sessions"],
+        "tts_cache_hits": cache_stats["hits"],
+        "tts_cache_misses": cache_stats["misses"],
+        "tts_cache_bytes": cache_stats["bytes"],
+        "ready": int(is_ready()),
+    }
+    return Response(render_prometheus(gauges), mimetype="text/plain; version=0.0.4")
+
+
+if METRICS_ENDPOINT:
+    app.route("/metrics")(metrics_endpoint)
+
+
+def sse(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def reply_events(session_id, user_input, request_start, timings, emit):
+    """
+    Stream the assistant's reply to user_input.
+
+    Yields emit(event, data) for each ``token``, ``audio`` and the final
+    ``done`` event, so the same pipeline serves SSE and WebSocket clients.
+    """
+    session_store.append(session_id, "user", user_input)
+    history = session_store.get_history(session_id)
+    chunks = []
+
+    # Synthesize each sentence while the LLM is still generating the next one
+    pipeline = SentencePipeline(synthesize_cached, audio_store.directory, start_time=request_start)
+    audio_segments = []
+
+    def audio_events(wait=False):
+        for segment in pipeline.ready_segments(wait=wait):
+            audio_segments.append(f"/audio/{segment['filename']}")
+            yield emit("audio", {"index": segment["index"], "audio_url": audio_segments[-1]})
+
     try:
-        from TTS.api import TTS
+        with stage("llm"):
+            for chunk in stream_response(history, timings):
+                if not chunks:
+                    timings["time_to_first_token_ms"] = (time.perf_counter() - request_start) * 1000
+                chunks.append(chunk)
+                yield emit("token", {"text": chunk})
+                pipeline.add_text(chunk)
+                yield from audio_events()
+
+        assistant_response = "".join(chunks)
+        session_store.append(session_id, "assistant", assistant_response)
+
+        pipeline.finish()
+        yield from audio_events(wait=True)
+    except GeneratorExit:
+        pipeline.cancel()
+        raise
+
+    pipeline.record_stats()
+    if pipeline.first_audio_ms is not None:
+        timings["time_to_first_audio_ms"] = pipeline.first_audio_ms
+    timings["total_ms"] = (time.perf_counter() - request_start) * 1000
+    # Per-stage breakdown (stt, retrieval, llm, tts, history I/O, ...) when the request asked for it
+    stages = request_breakdown()
+    print(f"⏱️ Streamed reply: first token after {timings.get('time_to_first_token_ms', 0):.0f}ms, "
+          f"first audio after {timings.get('time_to_first_audio_ms', 0):.0f}ms, "
+          f"total {timings['total_ms']:.0f}ms")
+
+    yield emit("done", {
+        "user_input": user_input,
+        "assistant_response": assistant_response,
+        "audio_url": None,
+        "audio_segments": audio_segments,
+        "timings": {stage: round(ms, 1) for stage, ms in timings.items()},
+        **({"stages": stages} if stages is not None else {}),
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+def read_upload(audio_file):
+    """Read an uploaded audio file into memory"""
+    return audio_file.read()
 
-        # Initialize TTS model if not already done
-        if not hasattr(speak_to_file, "tts_model"):
-            speak_to_file.tts_model = TTS(model_name="tts_models/en/ljspeech/tacotron2-DDC", progress_bar=False,
-                                          gpu=False)
 
-        # Generate TTS audio
-        speak_to_file.tts_model.tts_to_file(text=text, file_path=filepath)
+def transcribe_audio(audio):
+    """Transcribe uploaded audio bytes or a PCM array; decoding happens in memory"""
+    with stage("stt"):
+        return transcribe(audio)
 
+
+def transcribe_upload(audio_file):
+    """Read an uploaded audio file and transcribe it without touching disk"""
+    return transcribe_audio(read_upload(audio_file))
+
+
+def synthesize_response(text):
+    """Generate TTS audio for a reply and return its URL, or None if TTS failed"""
+    try:
+        path = synthesize_cached(text)
+        return f"/audio/{os.path.basename(path)}" if path else None
     except Exception as e:
         print(f"TTS Error: {e}")
-        # Fallback to basic TTS if Coqui fails (though it should be installed)
-        # This fallback might not be ideal for speed, but prevents total failure
-        speak(text)  # This will use the existing TTS function from tts.py
+        return None
 
 
-def initialize_app():
-    """Initialize the application"""
-    print("🏥 Initializing Clifton Hospital Voice Assistant...")
+def synthesize_cached(text, filepath=None):
+    """
+    Return the path of audio for text, from the TTS cache when possible.
 
-    # Load medical knowledge into Pinecone
+    Hits skip the TTS stage entirely. Text the cache doesn't admit yet is
+    synthesized to filepath (a new file in the audio store by default).
+    """
+    return tts_cache.synthesize(text, lambda path: speak_to_file(text, path),
+                                path=filepath or audio_store.new_path("response"))
+
+
+def speak_to_file(text, filepath):
+    """Generate TTS audio and save to file"""
     try:
-        load_medical_knowledge()
-        print("✅ Medical knowledge loaded successfully")
+        with stage("tts"):
+            # Shared model, loaded on first use (or by the warm-up thread)
+            with timed("tts"):
+                get_tts_model().tts_to_file(text=text, file_path=filepath)
+
     except Exception as e:
-        print(f"⚠️ Warning: Could not load medical knowledge: {e}")
+        print(f"TTS Error: {e}")
+        # Leave no partial file behind: callers (and the TTS cache) treat a missing file as a failed synthesis.
+        # No fallback to speak(): it would re-enter the TTS cache under this text's lock and deadlock
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+
+def prewarm_tts_cache():
+    """Fill the TTS cache with the fallback replies and the phrases in TTS_CACHE_PHRASES_FILE"""
+    with loading("tts_cache"), exclusive("tts_cache"):
+        start = time.perf_counter()
+        added = tts_cache.prewarm([NO_CLIENT_RESPONSE, ERROR_RESPONSE] + load_phrases(), speak_to_file)
+        print(f"🔊 TTS cache warmed: {added} new clips in {time.perf_counter() - start:.1f}s "
+              f"({tts_cache.stats()['entries']} cached)")
+
+
+def warm_embedding_model():
+    get_embedding_model()
+    embedding_stats = get_embedding_stats()
+    print(f"📊 Embedding model: {embedding_stats['model_name']} "
+          f"loaded in {embedding_stats['load_time_s']}s, "
+          f"{embedding_stats['parameter_bytes'] / (1024 * 1024):.1f} MB weights"
+          + (f", +{embedding_stats['rss_delta_bytes'] / (1024 * 1024):.1f} MB RSS"
+             if embedding_stats["rss_delta_bytes"] is not None else ""))
+
+
+def warm_triage():
+    """Embed the emergency centroids (inference, so per worker and never in the pre-fork master)"""
+    with loading("triage"):
+        get_triage_centroids()
+
+
+def warm_medical_knowledge():
+    """Make sure the medical knowledge base is indexed (already-indexed entries are skipped)"""
+    with loading("knowledge"), exclusive("knowledge"):
+        load_medical_knowledge()
+    print("✅ Medical knowledge loaded successfully")
+
+
+# Warm-up steps by component; WARMUP_COMPONENTS chooses which run and in what order
+WARMUP_LOADERS = {
+    "embedding": warm_embedding_model,
+    "triage": warm_triage,
+    "vector_index": get_index,
+    "llm": get_groq_client,
+    "stt": get_stt_backend,
+    "tts": get_tts_model,
+    "knowledge": warm_medical_knowledge,
+    "tts_cache": prewarm_tts_cache,
+}
+
 
-    print("🚀 Clifton Hospital Voice Assistant is ready!")
+def initialize_app():
+    """Initialize the application; models load in the background so /health answers right away"""
+    print("🏥 Initializing Clifton Hospital Voice Assistant...")
+
+    # Expire old reply audio and spilled sessions in the background
+    audio_store.start_sweeper()
+    session_store.start_sweeper()
+
+    # Load models, index the knowledge base and pre-warm the TTS cache without blocking startup
+    start_warmup(WARMUP_LOADERS)
+
+    print(f"🚀 Clifton Hospital Voice Assistant is up after {get_startup_report()['uptime_s']}s "
+          f"(check /health/ready for model warm-up)")
     print("📍 Hospital Location: Street 8, Shah Allah Ditta, Islamabad")
     print("🆘 Emergency: 911")
 
+
+def preload_models():
+    """Load model weights in the gunicorn master so forked workers share them (see gunicorn.conf.py)"""
+    preload(WARMUP_LOADERS)
+
+
+def initialize_worker(workers, torch_threads):
+    """
+    Set up one forked gunicorn worker.
+
+    Each worker gets its own slice of the cores for PyTorch so workers don't
+    oversubscribe the CPU, and sessions are written through to disk because
+    consecutive requests of one conversation can land on different workers.
+    """
+    import torch
+
+    torch.set_num_threads(torch_threads)
+    if workers > 1:
+        session_store.write_through = True
+    print(f"👷 Worker {os.getpid()}: {torch_threads} PyTorch threads")
+    initialize_app()
+
 if __name__ == '__main__':
     initialize_app()
 
+    # No reloader: its parent process would run initialize_app() too and load every model
+    # into a process that never serves a request
     app.run(
         host='0.0.0.0',
         port=5000,
         debug=True,
+        use_reloader=False,
         ssl_context=('certs/cert.pem', 'certs/key.pem'),
         threaded=True
     )
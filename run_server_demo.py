@@ -6,6 +6,8 @@ import tempfile
 import json
 from datetime import datetime
 
+from triage import classify, ROUTINE
+
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
@@ -21,9 +23,8 @@ def get_demo_response(user_input):
     """Generate demo response based on keywords"""
     user_lower = user_input.lower()
     
-    # Check for emergency keywords
-    emergency_keywords = ["chest pain", "can't breathe", "emergency", "severe pain", "bleeding"]
-    if any(keyword in user_lower for keyword in emergency_keywords):
+    # Same emergency triage as the full server (patterns only, no embedding model in the demo)
+    if classify(user_input)["severity"] != ROUTINE:
         return DEMO_MEDICAL_RESPONSES["emergency"]
     
     # Check for appointment keywords
@@ -0,0 +1,177 @@
+# scheduler.py
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# === Configuration ===
+MAX_ACTIVE_REQUESTS = int(os.getenv("MAX_ACTIVE_REQUESTS", "8"))
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", "16"))
+QUEUE_TIMEOUT = float(os.getenv("QUEUE_TIMEOUT", "30"))  # seconds a request may wait for a slot
+
+# Per-stage concurrency: Groq is network-bound, and the shared Tacotron model is
+# safest one call at a time. openai-whisper's decoder installs kv-cache hooks on
+# the shared model, so it must only ever run one inference at a time: with
+# batching, callers merely queue clips for the single batch thread (enough must
+# get in to fill a batch); without it, one caller at a time. CTranslate2
+# (faster-whisper) runs its own worker pool and is safe to call concurrently.
+# Parallelism beyond that comes from more worker processes (gunicorn.conf.py).
+if os.getenv("STT_BACKEND", "whisper").lower() != "whisper":
+    _default_stt_concurrency = os.cpu_count() or 1
+elif os.getenv("STT_BATCHING", "1") == "1":
+    _default_stt_concurrency = max(os.cpu_count() or 1, int(os.getenv("STT_BATCH_MAX_SIZE", "8")))
+else:
+    _default_stt_concurrency = 1
+STAGE_LIMITS = {
+    "stt": int(os.getenv("STT_CONCURRENCY", str(_default_stt_concurrency))),
+    "llm": int(os.getenv("LLM_CONCURRENCY", "8")),
+    "tts": int(os.getenv("TTS_CONCURRENCY", "1")),
+}
+
+
+class ServerBusy(Exception):
+    """Raised when a request can't be admitted; carries back-pressure hints for the client"""
+
+    def __init__(self, queue_position, retry_after):
+        super().__init__(f"Server busy (queue position {queue_position}, retry after {retry_after}s)")
+        self.queue_position = queue_position
+        self.retry_after = retry_after
+
+
+class RequestScheduler:
+    """
+    Admission control for voice requests.
+
+    Up to max_active requests run at once; up to max_queue more wait in FIFO
+    order for a free slot. Anything beyond that, or a request that waits longer
+    than queue_timeout, is rejected with ServerBusy.
+    """
+
+    def __init__(self, max_active=MAX_ACTIVE_REQUESTS, max_queue=MAX_QUEUED_REQUESTS, queue_timeout=QUEUE_TIMEOUT):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters = deque()
+        self._service_times = deque(maxlen=50)
+        self.completed = 0
+        self.rejected = 0
+
+    def retry_after(self, queue_position):
+        """Estimate seconds until a request at queue_position would be served"""
+        average = sum(self._service_times) / len(self._service_times) if self._service_times else 5.0
+        return max(1, math.ceil(average * math.ceil(queue_position / max(self.max_active, 1))))
+
+    def acquire(self):
+        """Block until a slot is free; returns the start time to pass to release()"""
+        with self._lock:
+            if self._active < self.max_active and not self._waiters:
+                self._active += 1
+                return time.perf_counter()
+
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                position = len(self._waiters) + 1
+                raise ServerBusy(position, self.retry_after(position))
+
+            handed_over = threading.Event()
+            self._waiters.append(handed_over)
+
+        if not handed_over.wait(self.queue_timeout):
+            with self._lock:
+                if handed_over in self._waiters:
+                    position = self._waiters.index(handed_over) + 1
+                    self._waiters.remove(handed_over)
+                    self.rejected += 1
+                    raise ServerBusy(position, self.retry_after(position))
+            # The slot was handed over just as the wait timed out
+
+        return time.perf_counter()
+
+    def release(self, started_at):
+        with self._lock:
+            self._service_times.append(time.perf_counter() - started_at)
+            self.completed += 1
+            if self._waiters:
+                # Hand the slot straight to the oldest waiter (FIFO)
+                self._waiters.popleft().set()
+            else:
+                self._active -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": self._active,
+                "queued": len(self._waiters),
+                "max_active": self.max_active,
+                "max_queue": self.max_queue,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "stages": {name: {"limit": STAGE_LIMITS[name], "in_use": _stage_in_use[name]}
+                           for name in STAGE_LIMITS},
+            }
+
+
+class KeyedLocks:
+    """
+    One lock per key, for single-flight work on the same item.
+
+    A key's lock is created on first use and dropped only once no thread holds
+    or waits for it, so a late caller always queues behind the current one
+    instead of getting a fresh lock of its own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}  # key -> [lock, threads holding or waiting for it]
+
+    @contextmanager
+    def hold(self, key):
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._locks)
+
+
+# Per-stage semaphores shared by every request in the process
+_stage_semaphores = {name: threading.BoundedSemaphore(max(limit, 1)) for name, limit in STAGE_LIMITS.items()}
+_stage_in_use = {name: 0 for name in STAGE_LIMITS}
+_stage_lock = threading.Lock()
+
+
+@contextmanager
+def stage(name):
+    """Limit how many requests run a pipeline stage (stt, llm, tts) at the same time"""
+    semaphore = _stage_semaphores[name]
+    semaphore.acquire()
+    with _stage_lock:
+        _stage_in_use[name] += 1
+    try:
+        yield
+    finally:
+        with _stage_lock:
+            _stage_in_use[name] -= 1
+        semaphore.release()
+
+
+# Process-wide scheduler used by run_server
+scheduler = RequestScheduler()
@@ -0,0 +1,236 @@
+# session_memory.py
+import atexit
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from metrics import instrumented
+
+# Load environment variables
+load_dotenv()
+
+# === Configuration ===
+SESSION_DIR = os.getenv("SESSION_DIR", "sessions")
+MAX_ACTIVE_SESSIONS = int(os.getenv("MAX_ACTIVE_SESSIONS", "500"))
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "1800"))  # seconds
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "200"))
+SESSION_FILE_TTL = float(os.getenv("SESSION_FILE_TTL", str(30 * 24 * 3600)))  # seconds a spilled session is kept
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "3600"))  # seconds between sweeps
+# Write every message straight to disk and reload sessions changed by another process.
+# Needed when several server processes share SESSION_DIR (gunicorn turns it on for WEB_WORKERS > 1)
+SESSION_WRITE_THROUGH = os.getenv("SESSION_WRITE_THROUGH", "0") == "1"
+
+# Session IDs end up in file names, so only accept URL-safe tokens
+_SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+
+def new_session_id():
+    return secrets.token_urlsafe(24)
+
+
+def is_valid_session_id(session_id):
+    return bool(session_id) and bool(_SESSION_ID_PATTERN.match(session_id))
+
+
+class SessionStore:
+    """
+    Per-session conversation history for the web server.
+
+    Active sessions live in memory in LRU order; sessions idle for longer than
+    idle_timeout, or pushed out by the max_active cap, are written to
+    ``<directory>/<session_id>.jsonl`` and reloaded transparently on return.
+    A background sweeper deletes spilled files untouched for longer than
+    file_ttl.
+
+    With write_through, every append is saved immediately and a cached
+    session is reloaded whenever its file was changed by another process, so
+    worker processes behind a load balancer see one consistent history.
+    """
+
+    def __init__(self, directory=SESSION_DIR, max_active=MAX_ACTIVE_SESSIONS,
+                 idle_timeout=SESSION_IDLE_TIMEOUT, max_messages=SESSION_MAX_MESSAGES,
+                 write_through=SESSION_WRITE_THROUGH, file_ttl=SESSION_FILE_TTL,
+                 sweep_interval=SESSION_SWEEP_INTERVAL):
+        self.directory = directory
+        self.max_active = max_active
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self.write_through = write_through
+        self.file_ttl = file_ttl
+        self.sweep_interval = sweep_interval
+        # session_id -> {"messages": [...], "last_access": float, "dirty": bool, "mtime": file mtime when last synced}
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+        self.evictions = 0
+        self.reloads = 0
+        self.expired_files = 0
+        self._sweeper = None
+
+    def _path(self, session_id):
+        return os.path.join(self.directory, f"{session_id}.jsonl")
+
+    def _disk_mtime(self, session_id):
+        try:
+            return os.stat(self._path(session_id)).st_mtime_ns
+        except OSError:
+            return None
+
+    # === Disk spill ===
+    def _load_from_disk(self, session_id):
+        path = self._path(session_id)
+        if not os.path.exists(path):
+            return []
+
+        messages = []
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        messages.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except IOError:
+            print(f"⚠️ Could not reload session {session_id[:8]}…")
+        self.reloads += 1
+        return messages
+
+    def _write_to_disk(self, session_id, messages):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(session_id)
+        try:
+            with open(path + ".tmp", "w", encoding="utf-8") as file:
+                for message in messages:
+                    file.write(json.dumps(message) + "\n")
+            os.replace(path + ".tmp", path)
+        except IOError:
+            print(f"⚠️ Could not save session {session_id[:8]}…")
+
+    def _evict(self, session_id):
+        session = self._sessions.pop(session_id)
+        if session["dirty"]:
+            self._write_to_disk(session_id, session["messages"])
+        self.evictions += 1
+
+    def _evict_idle_and_overflow(self):
+        # OrderedDict is in access order, so idle sessions are always at the front
+        now = time.monotonic()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_active or now - session["last_access"] > self.idle_timeout:
+                self._evict(session_id)
+            else:
+                break
+
+    def _get_session(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is not None and self.write_through and session["mtime"] != self._disk_mtime(session_id):
+            session = None  # written by another process since we last synced
+        if session is None:
+            mtime = self._disk_mtime(session_id)
+            session = {"messages": self._load_from_disk(session_id), "dirty": False, "mtime": mtime}
+            self._sessions[session_id] = session
+        session["last_access"] = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        self._evict_idle_and_overflow()
+        return session
+
+    # === Public API ===
+    @instrumented("history_read")
+    def get_history(self, session_id):
+        """Return a copy of the session's messages (role/content dicts)"""
+        with self._lock:
+            return list(self._get_session(session_id)["messages"])
+
+    @instrumented("history_write")
+    def append(self, session_id, role, content):
+        with self._lock:
+            session = self._get_session(session_id)
+            session["messages"].append({"role": role, "content": content})
+            if len(session["messages"]) > self.max_messages:
+                del session["messages"][:-self.max_messages]
+            if self.write_through:
+                self._write_to_disk(session_id, session["messages"])
+                session["mtime"] = self._disk_mtime(session_id)
+            else:
+                session["dirty"] = True
+
+    def clear(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            try:
+                os.remove(self._path(session_id))
+            except FileNotFoundError:
+                pass
+
+    def flush(self):
+        """Write every active session with unsaved messages to disk"""
+        with self._lock:
+            for session_id, session in self._sessions.items():
+                if session["dirty"]:
+                    self._write_to_disk(session_id, session["messages"])
+                    session["dirty"] = False
+
+    def sweep(self):
+        """Delete spilled session files not written for longer than file_ttl, skipping active sessions"""
+        now = time.time()
+        expired = 0
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            session_id, extension = os.path.splitext(entry.name)
+            if extension != ".jsonl" or not is_valid_session_id(session_id):
+                continue
+            with self._lock:
+                if session_id in self._sessions:
+                    continue
+                try:
+                    if now - entry.stat().st_mtime > self.file_ttl:
+                        os.remove(entry.path)
+                        expired += 1
+                except OSError:
+                    continue  # removed concurrently
+        with self._lock:
+            self.expired_files += expired
+        if expired:
+            print(f"🧹 Session store: removed {expired} expired session files")
+
+    def _run_sweeper(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"⚠️ Session sweep failed: {e}")
+
+    def start_sweeper(self):
+        """Sweep once now, then periodically on a daemon thread"""
+        self.sweep()
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._run_sweeper, daemon=True)
+            self._sweeper.start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active_sessions": len(self._sessions),
+                "max_active_sessions": self.max_active,
+                "idle_timeout_s": self.idle_timeout,
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+                "expired_files": self.expired_files,
+                "file_ttl_s": self.file_ttl,
+                "write_through": self.write_through,
+            }
+
+
+# Process-wide store used by run_server
+session_store = SessionStore()
+atexit.register(session_store.flush)
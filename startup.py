@@ -0,0 +1,175 @@
+# startup.py
+import gc
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# === Configuration ===
+# Load models in a background thread after startup (0 = load each on first use)
+WARMUP = os.getenv("WARMUP", "1") == "1"
+# Components loaded by the warm-up thread, in order
+WARMUP_COMPONENTS = [name.strip() for name in
+                     os.getenv("WARMUP_COMPONENTS", "embedding,triage,vector_index,llm,stt,tts,knowledge,tts_cache").split(",")
+                     if name.strip()]
+# Loaded in the pre-fork master under gunicorn so workers share the weights copy-on-write.
+# Only plain model weights belong here: network clients and anything that runs inference load per worker
+PRELOAD_COMPONENTS = [name.strip() for name in os.getenv("PRELOAD_COMPONENTS", "embedding,stt,tts").split(",")
+                      if name.strip()]
+# The server is ready without these: it just knows less, synthesizes canned phrases on demand
+# or computes the triage centroids on the first message that no emergency pattern matches
+OPTIONAL_COMPONENTS = {"knowledge", "tts_cache", "triage"}
+
+PROCESS_START = time.time()
+
+_lock = threading.Lock()
+_components = {}  # name -> {"state", "load_time_s", "error", "ready_at"}
+_warmup = {"state": "disabled" if not WARMUP else "pending"}
+
+
+@contextmanager
+def exclusive(name):
+    """
+    Hold a lock shared by every worker process on this machine.
+
+    One-off warm-up work (indexing the knowledge base, pre-warming the TTS
+    cache) runs in one worker at a time; the others wait and then find it done.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        # No fcntl on Windows, where the server runs as a single process anyway
+        yield
+        return
+
+    with open(os.path.join(tempfile.gettempdir(), f"clifton_{name}.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def loading(name):
+    """Record how long component name takes to load and whether it succeeded"""
+    with _lock:
+        _components[name] = {"state": "loading", "load_time_s": None, "error": None, "ready_at": None}
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        with _lock:
+            _components[name].update(state="failed", error=str(e),
+                                     load_time_s=round(time.perf_counter() - start, 3))
+        raise
+    with _lock:
+        _components[name].update(state="ready", load_time_s=round(time.perf_counter() - start, 3),
+                                 ready_at=time.time())
+
+
+def mark_imported(name="imports"):
+    """Record the time from process start until the server modules finished importing"""
+    with _lock:
+        _components[name] = {"state": "ready", "load_time_s": round(time.time() - PROCESS_START, 3), "error": None,
+                             "ready_at": time.time()}
+
+
+def _run_warmup(loaders):
+    with _lock:
+        _warmup["state"] = "running"
+
+    for name in WARMUP_COMPONENTS:
+        loader = loaders.get(name)
+        if loader is None:
+            continue
+        try:
+            loader()
+        except Exception as e:
+            print(f"⚠️ Warm-up of {name} failed: {e}")
+
+    with _lock:
+        _warmup["state"] = "done"
+    report = get_report()
+    breakdown = ", ".join(f"{name} {info['load_time_s']}s" for name, info in report["components"].items()
+                          if info["load_time_s"] is not None)
+    if report["time_to_ready_s"] is not None:
+        print(f"🔥 Warm-up finished: ready after {report['time_to_ready_s']}s ({breakdown})")
+    else:
+        print(f"⚠️ Warm-up finished but a required component failed to load ({breakdown})")
+
+
+def preload(loaders):
+    """
+    Load the PRELOAD_COMPONENTS synchronously before the server forks workers.
+
+    Afterwards every object is moved out of the garbage collector's reach
+    (gc.freeze) so collections in the workers don't write to, and thereby
+    copy, the pages holding the preloaded models.
+    """
+    start = time.perf_counter()
+    for name in PRELOAD_COMPONENTS:
+        loader = loaders.get(name)
+        if loader is None:
+            continue
+        try:
+            loader()
+        except Exception as e:
+            print(f"⚠️ Preloading {name} failed, workers will load it themselves: {e}")
+    gc.collect()
+    gc.freeze()
+    print(f"📦 Preloaded {', '.join(PRELOAD_COMPONENTS)} in {time.perf_counter() - start:.1f}s before forking workers")
+
+
+def start_warmup(loaders):
+    """
+    Load components on a background thread so the server answers immediately.
+
+    Args:
+        loaders (dict): Component name -> zero-argument callable that loads it.
+    """
+    if not WARMUP:
+        return None
+    thread = threading.Thread(target=_run_warmup, args=(loaders,), daemon=True, name="warmup")
+    thread.start()
+    return thread
+
+
+def _required():
+    return [name for name in WARMUP_COMPONENTS if name not in OPTIONAL_COMPONENTS]
+
+
+def is_ready():
+    """
+    Ready once every required warm-up component has loaded.
+
+    With warm-up disabled, models load on first use and the server is ready
+    straight away (the first requests are just slower).
+    """
+    if not WARMUP:
+        return True
+    with _lock:
+        return all(_components.get(name, {}).get("state") == "ready" for name in _required())
+
+
+def get_report():
+    """Startup breakdown: per-component load state and time, and time to readiness"""
+    with _lock:
+        components = {name: {key: value for key, value in info.items() if key != "ready_at"}
+                      for name, info in _components.items()}
+        ready_times = [_components.get(name, {}).get("ready_at") for name in _required()]
+        warmup = _warmup["state"]
+    time_to_ready = (round(max(ready_times, default=PROCESS_START) - PROCESS_START, 3)
+                     if all(ready_times) else None)
+    return {
+        "uptime_s": round(time.time() - PROCESS_START, 1),
+        "warmup": warmup,
+        "time_to_ready_s": time_to_ready,
+        "components": components,
+    }
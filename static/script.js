@@ -5,6 +5,7 @@ let currentChatId = null;
 let chatHistory = [];
 let mediaRecorder = null;
 let audioChunks = [];
+let streamingUnavailable = false;
 
 // DOM elements
 const themeToggle = document.getElementById('themeToggle');
@@ -283,6 +284,16 @@ async function startContinuousListening() {
 
 async function continuousListeningLoop() {
     while (isListening) {
+        // Prefer server-side streaming recognition; fall back to recording and uploading clips
+        if (!streamingUnavailable && 'WebSocket' in window) {
+            try {
+                await streamVoice();
+                continue;
+            } catch (error) {
+                console.warn('Streaming recognition unavailable, falling back to uploads:', error);
+                streamingUnavailable = true;
+            }
+        }
         try {
             const audioBlob = await recordAudio();
             if (audioBlob && audioBlob.size > 0) {
@@ -337,27 +348,37 @@ async function processAudio(audioBlob) {
         const formData = new FormData();
         formData.append('audio', audioBlob, 'audio.wav');
         
-        const response = await fetch('/process_voice', {
+        const response = await fetch('/process_voice_stream', {
             method: 'POST',
             body: formData
         });
         
-        const data = await response.json();
+        if (response.status === 503) {
+            // Server is at capacity: back off for as long as it asks before listening again
+            const retryAfter = parseInt(response.headers.get('Retry-After') || '2', 10);
+            console.warn(`Server busy, retrying in ${retryAfter}s`);
+            await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+            updateVoiceStatus('listening');
+            return;
+        }
         
-        if (data.user_input && data.user_input.trim()) {
-            addMessage('user', data.user_input);
-            
-            if (data.assistant_response) {
+        if (!response.ok || !response.body) {
+            updateVoiceStatus('listening');
+            return;
+        }
+        
+        const reply = createReplyState();
+        
+        await readEventStream(response, (event, payload) => {
+            if (event === 'transcript') {
+                addMessage('user', payload.user_input);
                 updateVoiceStatus('speaking');
-                addMessage('assistant', data.assistant_response);
-                
-                // Play TTS response if not muted
-                if (!isMuted && data.audio_url) {
-                    await playAudio(data.audio_url);
-                }
+            } else {
+                handleReplyEvent(reply, event, payload);
             }
-        }
+        });
         
+        await finishReply(reply);
         updateVoiceStatus('listening');
         
     } catch (error) {
@@ -366,9 +387,217 @@ async function processAudio(audioBlob) {
     }
 }
 
+function createReplyState() {
+    // Sentence audio segments are played back-to-back as soon as each is ready
+    return { streamingElement: null, streamedText: '', data: null, playback: Promise.resolve() };
+}
+
+function handleReplyEvent(reply, event, payload) {
+    switch (event) {
+        case 'token':
+            // Render the reply as it is generated
+            if (!reply.streamingElement) {
+                reply.streamingElement = createMessageElement({ role: 'assistant', content: '' });
+                chatMessages.appendChild(reply.streamingElement);
+            }
+            reply.streamedText += payload.text;
+            reply.streamingElement.querySelector('.message-text').textContent = reply.streamedText;
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+            break;
+        case 'audio':
+            if (!isMuted) {
+                reply.playback = reply.playback.then(() => playAudio(payload.audio_url));
+            }
+            break;
+        case 'done':
+            reply.data = payload;
+            break;
+        case 'error':
+            console.error('Error from server:', payload.error);
+            break;
+    }
+}
+
+async function finishReply(reply) {
+    const data = reply.data;
+    if (data && data.assistant_response) {
+        if (data.timings) {
+            console.log('Response timings (ms):', data.timings);
+        }
+        // Replace the streaming placeholder with the saved message
+        if (reply.streamingElement) {
+            reply.streamingElement.remove();
+        }
+        addMessage('assistant', data.assistant_response);
+        
+        // Play TTS response if not muted
+        if (!isMuted && data.audio_url) {
+            reply.playback = reply.playback.then(() => playAudio(data.audio_url));
+        }
+    }
+    
+    await reply.playback;
+}
+
+function openVoiceSocket() {
+    return new Promise((resolve, reject) => {
+        const protocol = location.protocol === 'https:' ? 'wss' : 'ws';
+        const socket = new WebSocket(`${protocol}://${location.host}/ws/voice`);
+        socket.binaryType = 'arraybuffer';
+        socket.onopen = () => resolve(socket);
+        socket.onerror = () => reject(new Error('Could not open /ws/voice'));
+    });
+}
+
+function downsampleToInt16(input, inputRate) {
+    // Average the microphone samples down to 16 kHz 16-bit PCM for the server
+    const ratio = inputRate / 16000;
+    const output = new Int16Array(Math.floor(input.length / ratio));
+    for (let i = 0; i < output.length; i++) {
+        const start = Math.floor(i * ratio);
+        const end = Math.max(Math.floor((i + 1) * ratio), start + 1);
+        let sum = 0;
+        for (let j = start; j < end; j++) {
+            sum += input[j];
+        }
+        const sample = Math.max(-1, Math.min(1, sum / (end - start)));
+        output[i] = sample * 0x7fff;
+    }
+    return output.buffer;
+}
+
+async function streamVoice() {
+    // Send microphone audio while the user speaks; the server detects the end of
+    // speech and transcribes incrementally, so the reply starts right away
+    const socket = await openVoiceSocket();
+    let stream;
+    try {
+        stream = await navigator.mediaDevices.getUserMedia({ audio: { echoCancellation: true, noiseSuppression: true } });
+    } catch (error) {
+        socket.close();
+        throw error;
+    }
+    const audioContext = new (window.AudioContext || window.webkitAudioContext)();
+    const source = audioContext.createMediaStreamSource(stream);
+    const processor = audioContext.createScriptProcessor(4096, 1, 1);
+    let paused = false;
+    let partialElement = null;
+    let reply = null;
+    
+    const resume = () => {
+        paused = false;
+        updateVoiceStatus('listening');
+    };
+    
+    processor.onaudioprocess = (event) => {
+        if (paused || socket.readyState !== WebSocket.OPEN) return;
+        socket.send(downsampleToInt16(event.inputBuffer.getChannelData(0), audioContext.sampleRate));
+    };
+    source.connect(processor);
+    processor.connect(audioContext.destination);
+    
+    socket.onmessage = async (message) => {
+        const { event, data } = JSON.parse(message.data);
+        switch (event) {
+            case 'partial':
+                // Show what has been recognised so far
+                if (!partialElement) {
+                    partialElement = createMessageElement({ role: 'user', content: '' });
+                    chatMessages.appendChild(partialElement);
+                }
+                partialElement.querySelector('.message-text').textContent = data.text;
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+                break;
+            case 'transcript':
+                // Stop sending audio while the reply is generated and played
+                paused = true;
+                if (partialElement) {
+                    partialElement.remove();
+                    partialElement = null;
+                }
+                if (data.user_input) {
+                    addMessage('user', data.user_input);
+                    updateVoiceStatus('speaking');
+                    reply = createReplyState();
+                }
+                break;
+            case 'busy':
+                console.warn(`Server busy, retrying in ${data.retry_after}s`);
+                setTimeout(resume, data.retry_after * 1000);
+                break;
+            case 'error':
+                console.error('Error from server:', data.error);
+                resume();
+                break;
+            case 'done':
+                handleReplyEvent(reply, event, data);
+                await finishReply(reply);
+                resume();
+                break;
+            default:
+                if (reply) {
+                    handleReplyEvent(reply, event, data);
+                }
+        }
+    };
+    
+    await new Promise(resolve => {
+        const stopCheck = setInterval(() => {
+            if (!isListening) {
+                socket.close();
+            }
+        }, 250);
+        socket.onclose = () => {
+            clearInterval(stopCheck);
+            resolve();
+        };
+    });
+    
+    processor.disconnect();
+    source.disconnect();
+    stream.getTracks().forEach(track => track.stop());
+    audioContext.close();
+}
+
+async function readEventStream(response, onEvent) {
+    // Minimal server-sent events parser for a fetch() response body
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
+// Ask the server for compressed speech: Opus where supported, MP3 otherwise (WAV as a last resort)
+const AUDIO_FORMAT = (() => {
+    const probe = document.createElement('audio');
+    if (probe.canPlayType('audio/ogg; codecs="opus"')) return 'opus';
+    if (probe.canPlayType('audio/mpeg')) return 'mp3';
+    return 'wav';
+})();
+
 function playAudio(audioUrl) {
     return new Promise((resolve) => {
-        const audio = new Audio(audioUrl);
+        const separator = audioUrl.includes('?') ? '&' : '?';
+        const audio = new Audio(`${audioUrl}${separator}format=${AUDIO_FORMAT}`);
         audio.onended = resolve;
         audio.onerror = resolve;
         audio.play();
@@ -0,0 +1,169 @@
+# streaming_stt.py
+import os
+import time
+from collections import deque
+
+import numpy as np
+from dotenv import load_dotenv
+
+from audio_io import SAMPLE_RATE
+
+# Load environment variables
+load_dotenv()
+
+# === Configuration ===
+STREAM_VAD_THRESHOLD = float(os.getenv("STREAM_VAD_THRESHOLD", "0.01"))  # frame RMS above this counts as speech
+STREAM_SILENCE_MS = int(os.getenv("STREAM_SILENCE_MS", "700"))  # silence that ends an utterance
+STREAM_PARTIAL_INTERVAL_MS = int(os.getenv("STREAM_PARTIAL_INTERVAL_MS", "1000"))  # new audio between partials
+STREAM_WINDOW_SECONDS = float(os.getenv("STREAM_WINDOW_SECONDS", "10"))  # audio decoded per partial
+
+FRAME_MS = 30
+MIN_SPEECH_MS = 300  # shorter bursts (coughs, clicks) are discarded
+PRE_ROLL_MS = 300  # audio kept from before the onset so the first syllable isn't clipped
+CUT_SEARCH_MS = 1000  # without a pause, a full window is cut at the quietest frame of this much more audio
+MAX_WINDOW_SECONDS = 28  # stay inside Whisper's 30 s input window
+
+
+class StreamingTranscriber:
+    """
+    Incremental speech recognition for audio that arrives while the user is speaking.
+
+    Audio is fed in small chunks and split into 30 ms frames for an energy VAD.
+    While speech continues, the current window is re-decoded every
+    STREAM_PARTIAL_INTERVAL_MS to produce partial transcripts. Once a window
+    grows past STREAM_WINDOW_SECONDS it is committed at the next pause, or,
+    if the speaker doesn't pause within CUT_SEARCH_MS, at the quietest frame
+    of that last stretch, with the audio after the cut carried into the new
+    window. No decode is longer than the window plus that stretch, so
+    continuous speech costs linear rather than quadratic Whisper time. When
+    STREAM_SILENCE_MS of silence ends the utterance only the last window is
+    decoded, and not at all if no speech arrived after the latest partial.
+    """
+
+    def __init__(self, transcribe, threshold=STREAM_VAD_THRESHOLD, silence_ms=STREAM_SILENCE_MS,
+                 partial_interval_ms=STREAM_PARTIAL_INTERVAL_MS, window_seconds=STREAM_WINDOW_SECONDS):
+        """
+        Args:
+            transcribe (callable): transcribe(float32 16 kHz array) -> str.
+        """
+        self.transcribe = transcribe
+        self.threshold = threshold
+        self.frame_samples = SAMPLE_RATE * FRAME_MS // 1000
+        self.silence_frames = max(silence_ms // FRAME_MS, 1)
+        self.partial_frames = max(partial_interval_ms // FRAME_MS, 1)
+        self.cut_search_frames = CUT_SEARCH_MS // FRAME_MS
+        self.window_frames = int(min(window_seconds * 1000, MAX_WINDOW_SECONDS * 1000 - CUT_SEARCH_MS) // FRAME_MS)
+        self._pending = np.empty(0, dtype=np.float32)
+        self._pre_roll = deque(maxlen=PRE_ROLL_MS // FRAME_MS)
+        self.reset()
+
+    def reset(self):
+        """Forget the current utterance"""
+        self.speaking = False
+        self._committed = []
+        self._window = []
+        self._speech_frames = 0
+        self._silent_run = 0
+        self._since_partial = 0
+        self._partial_text = None
+        self._voiced_since_partial = False
+
+    def feed(self, audio):
+        """
+        Add float32 16 kHz samples and return the events they produced.
+
+        Returns:
+            list: (event, data) tuples - ``speech_start``, ``partial`` with the
+            text so far, and ``transcript`` with the final user_input.
+        """
+        self._pending = np.concatenate([self._pending, np.asarray(audio, dtype=np.float32)])
+        usable = len(self._pending) - len(self._pending) % self.frame_samples
+        frames, self._pending = self._pending[:usable], self._pending[usable:]
+
+        events = []
+        for frame in frames.reshape(-1, self.frame_samples):
+            events.extend(self._process_frame(frame))
+        return events
+
+    def flush(self):
+        """Finalize whatever has been said so far (e.g. the client stopped sending audio)"""
+        return self._finalize() if self.speaking else []
+
+    def _process_frame(self, frame):
+        voiced = float(np.sqrt(np.mean(frame ** 2))) > self.threshold
+
+        if not self.speaking:
+            if not voiced:
+                self._pre_roll.append(frame)
+                return []
+            self.speaking = True
+            self._window = list(self._pre_roll) + [frame]
+            self._pre_roll.clear()
+            self._speech_frames = 1
+            self._voiced_since_partial = True
+            return [("speech_start", {})]
+
+        self._window.append(frame)
+        self._since_partial += 1
+        if voiced:
+            self._speech_frames += 1
+            self._silent_run = 0
+            self._voiced_since_partial = True
+        else:
+            self._silent_run += 1
+            if self._silent_run >= self.silence_frames:
+                return self._finalize()
+
+        # Commit a long window at a pause, or at its quietest recent frame if the speaker doesn't pause
+        cut = self._window_cut(voiced)
+        if cut is not None:
+            self._committed.append(self._decode(self._window[:cut]))
+            self._window = self._window[cut:]
+            self._partial_text = None
+            self._since_partial = 0
+            self._voiced_since_partial = bool(self._window)  # carried-over speech isn't in any partial yet
+            return [("partial", {"text": self._text()})]
+
+        if self._since_partial >= self.partial_frames and self._voiced_since_partial:
+            self._partial_text = self._decode(self._window)
+            self._since_partial = 0
+            self._voiced_since_partial = False
+            return [("partial", {"text": self._text(self._partial_text)})]
+
+        return []
+
+    def _window_cut(self, voiced):
+        """Number of frames of the current window to commit now, or None to keep it open"""
+        if len(self._window) < self.window_frames:
+            return None
+        if not voiced:
+            return len(self._window)
+        if len(self._window) < self.window_frames + self.cut_search_frames:
+            return None
+        recent = self._window[-self.cut_search_frames:]
+        quietest = min(range(len(recent)), key=lambda i: float(np.mean(recent[i] ** 2)))
+        return len(self._window) - len(recent) + quietest + 1
+
+    def _finalize(self):
+        start = time.perf_counter()
+        if self._speech_frames * FRAME_MS < MIN_SPEECH_MS:
+            self.reset()
+            return []
+
+        # The latest partial already covers every voiced frame of this window, so reuse it
+        if self._partial_text is not None and not self._voiced_since_partial:
+            tail = self._partial_text
+        else:
+            # Drop the trailing silence that ended the utterance before decoding
+            tail = self._decode(self._window[:max(len(self._window) - self._silent_run, 0)])
+
+        text = self._text(tail)
+        finalize_ms = (time.perf_counter() - start) * 1000
+        self.reset()
+        return [("transcript", {"user_input": text, "finalize_ms": round(finalize_ms, 1)})]
+
+    def _decode(self, frames):
+        return self.transcribe(np.concatenate(frames)).strip() if frames else ""
+
+    def _text(self, tail=""):
+        return " ".join(part for part in self._committed + [tail] if part)
@@ -1,35 +1,65 @@
 # stt.py
 
-import whisper
-import sounddevice as sd
-import numpy as np
-import scipy.io.wavfile as wav
-import tempfile
 import os
+import threading
 
-# Load model once
-model = whisper.load_model("medium.en")
+from audio_io import load_audio, SAMPLE_RATE
+from metrics import timed
+from startup import loading
+from stt_backends import load_backend, STT_BACKEND, STT_MODEL_SIZE, STT_QUANTIZE
 
-def transcribe(path=None, duration=10):
+# Micro-batch concurrent requests into one Whisper decode (set STT_BATCHING=0 to disable)
+STT_BATCHING = os.getenv("STT_BATCHING", "1") == "1"
+backend_options = {
+    "batching": STT_BATCHING,
+    "max_batch_size": int(os.getenv("STT_BATCH_MAX_SIZE", "8")),
+    "max_wait_ms": float(os.getenv("STT_BATCH_MAX_WAIT_MS", "50")),
+} if STT_BACKEND == "whisper" else {}
+
+# Model is loaded once, on first use (backend, size and quantization come from STT_BACKEND / STT_MODEL_SIZE / STT_QUANTIZE)
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the shared STT backend, loading it on first use"""
+    global _backend
+
+    if _backend is not None:
+        return _backend
+
+    with _backend_lock:
+        if _backend is None:
+            with loading("stt"):
+                _backend = load_backend(**backend_options)
+            print(f"✅ STT backend: {_backend.name} ({STT_MODEL_SIZE}.en, quantize={STT_QUANTIZE})")
+    return _backend
+
+
+def transcribe(audio=None, duration=10, sample_rate=SAMPLE_RATE):
     """
-    Transcribe either a WAV file or live mic input.
-    :param path: Path to WAV file. If None, records live audio.
+    Transcribe a file, in-memory audio, or live mic input.
+    :param audio: WAV path, encoded audio bytes, or a NumPy PCM buffer. If None, records live audio.
     :param duration: Recording duration in seconds for live mode.
+    :param sample_rate: Sample rate of a NumPy buffer (ignored for paths and bytes).
     :return: Transcribed text string.
     """
-    if path:
-        print(f"📂 Transcribing from file: {path}")
-        result = model.transcribe(path, language="en")
-        return result["text"].strip()
-    
-    print("🎤 Listening (live mic)...")
-    fs = 16000
-    audio = sd.rec(int(duration * fs), samplerate=fs, channels=1)
-    sd.wait()
-
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        wav.write(tmp.name, fs, audio)
-        result = model.transcribe(tmp.name)
-        os.remove(tmp.name)
-
-    return result["text"].strip()
+    if audio is None:
+        import sounddevice as sd
+
+        print("🎤 Listening (live mic)...")
+        audio = sd.rec(int(duration * SAMPLE_RATE), samplerate=SAMPLE_RATE, channels=1, dtype="float32")
+        sd.wait()
+    elif isinstance(audio, str):
+        print(f"📂 Transcribing from file: {audio}")
+
+    # Decode straight to a 16 kHz float32 array so the backend never reopens a file
+    with timed("audio_decode"):
+        audio = load_audio(audio, sample_rate)
+    with timed("stt"):
+        return get_backend().transcribe(audio)
+
+
+def get_stats():
+    """Backend statistics (batching throughput for the whisper backend, None when batching is disabled or not loaded)"""
+    return _backend.stats() if _backend is not None else None
@@ -0,0 +1,131 @@
+# stt_backends.py
+import os
+import threading
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# === Configuration ===
+# "whisper" (openai-whisper / PyTorch) or "faster-whisper" (CTranslate2)
+STT_BACKEND = os.getenv("STT_BACKEND", "whisper").lower()
+STT_MODEL_SIZE = os.getenv("STT_MODEL_SIZE", "medium")
+# "none" keeps float32 weights, "int8" quantizes them for faster CPU inference
+STT_QUANTIZE = os.getenv("STT_QUANTIZE", "none").lower()
+
+MODEL_SIZES = ("tiny", "base", "small", "medium")
+SAMPLE_RATE = 16000
+
+
+def english_model_name(size):
+    """Map a size to its English-only checkpoint (patients speak English here)"""
+    if size not in MODEL_SIZES:
+        raise ValueError(f"Unknown STT model size '{size}', expected one of {', '.join(MODEL_SIZES)}")
+    return f"{size}.en"
+
+
+def _replace_whisper_linears(module):
+    """
+    Swap whisper.model.Linear layers for plain nn.Linear so dynamic quantization
+    recognises them (whisper's subclass only adds a dtype cast, a no-op in fp32).
+    """
+    import torch
+    import whisper.model
+
+    for name, child in module.named_children():
+        if isinstance(child, whisper.model.Linear):
+            linear = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+            linear.weight = child.weight
+            linear.bias = child.bias
+            setattr(module, name, linear)
+        else:
+            _replace_whisper_linears(child)
+    return module
+
+
+class WhisperBackend:
+    """openai-whisper on CPU, optionally int8 dynamically quantized and micro-batched"""
+
+    name = "whisper"
+
+    def __init__(self, size=STT_MODEL_SIZE, quantize=STT_QUANTIZE, batching=True,
+                 max_batch_size=8, max_wait_ms=50):
+        import torch
+        import whisper
+
+        from stt_batcher import WhisperBatcher
+
+        self.size = size
+        self.quantize = quantize
+        self.model = whisper.load_model(english_model_name(size), device="cpu")
+        if quantize == "int8":
+            self.model = torch.quantization.quantize_dynamic(
+                _replace_whisper_linears(self.model), {torch.nn.Linear}, dtype=torch.qint8
+            )
+        elif quantize != "none":
+            raise ValueError(f"Unsupported quantization '{quantize}' for the whisper backend")
+
+        self.batcher = WhisperBatcher(self.model, max_batch_size, max_wait_ms) if batching else None
+        # Without the batcher, concurrent callers take turns on the model (decoding isn't thread-safe)
+        self._lock = threading.Lock()
+
+    def transcribe(self, audio):
+        """Transcribe a file path or float32 16 kHz array"""
+        if self.batcher is not None:
+            return self.batcher.transcribe(audio)
+        if not isinstance(audio, str):
+            audio = np.asarray(audio, dtype=np.float32).flatten()
+        with self._lock:
+            return self.model.transcribe(audio, language="en", fp16=False)["text"].strip()
+
+    def stats(self):
+        return self.batcher.stats() if self.batcher is not None else None
+
+
+class FasterWhisperBackend:
+    """CTranslate2 Whisper (faster-whisper) with int8 CPU kernels"""
+
+    name = "faster-whisper"
+
+    def __init__(self, size=STT_MODEL_SIZE, quantize=STT_QUANTIZE, workers=None):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError("STT_BACKEND=faster-whisper requires `pip install faster-whisper`") from e
+
+        self.size = size
+        self.quantize = quantize
+        workers = workers or int(os.getenv("STT_CONCURRENCY", str(os.cpu_count() or 1)))
+        self.model = WhisperModel(
+            english_model_name(size),
+            device="cpu",
+            compute_type="int8" if quantize == "int8" else "float32",
+            num_workers=workers,
+        )
+        self._lock = threading.Lock()
+        self._clips = 0
+
+    def transcribe(self, audio):
+        """Transcribe a file path or float32 16 kHz array"""
+        if not isinstance(audio, str):
+            audio = np.asarray(audio, dtype=np.float32).flatten()
+        segments, _ = self.model.transcribe(audio, language="en", beam_size=1, vad_filter=True)
+        text = " ".join(segment.text.strip() for segment in segments).strip()
+        with self._lock:
+            self._clips += 1
+        return text
+
+    def stats(self):
+        with self._lock:
+            return {"clips": self._clips}
+
+
+def load_backend(name=STT_BACKEND, size=STT_MODEL_SIZE, quantize=STT_QUANTIZE, **kwargs):
+    """Create the configured STT backend"""
+    if name == "whisper":
+        return WhisperBackend(size, quantize, **kwargs)
+    if name in ("faster-whisper", "faster_whisper", "ctranslate2"):
+        return FasterWhisperBackend(size, quantize)
+    raise ValueError(f"Unknown STT backend '{name}', expected 'whisper' or 'faster-whisper'")
@@ -0,0 +1,131 @@
+# stt_batcher.py
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import torch
+import whisper
+
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE  # 16 kHz
+MAX_CLIP_SECONDS = 30  # Whisper's fixed input window; longer clips are transcribed on their own
+
+# Same thresholds model.transcribe uses to decide a window contains no speech
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+
+class WhisperBatcher:
+    """
+    Dynamic micro-batching for Whisper on CPU.
+
+    Callers hand in a clip and block; a single worker thread collects every
+    clip that arrives within max_wait_ms (up to max_batch_size), decodes them
+    as one padded (N, n_mels, 3000) batch and hands each caller its text.
+    Audio loading and the log-mel spectrogram run in the caller's thread so
+    they overlap with the batch that is currently decoding. The model itself
+    is only ever used under one lock: decoding installs kv-cache hooks on the
+    shared decoder, so two inferences must never run at once.
+    """
+
+    def __init__(self, model, max_batch_size=8, max_wait_ms=50, language="en"):
+        self.model = model
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait_ms / 1000
+        self.options = whisper.DecodingOptions(language=language, fp16=False, without_timestamps=True)
+        self._stats = {"batches": 0, "clips": 0, "audio_seconds": 0.0, "decode_seconds": 0.0}
+        self._start_worker()
+        # Threads don't survive fork: a model preloaded by the gunicorn master
+        # needs a fresh worker thread (and queue) in every worker process
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._start_worker)
+
+    def _start_worker(self):
+        self._model_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def transcribe(self, audio):
+        """
+        Transcribe one clip, batching it with any concurrent requests.
+
+        Args:
+            audio (str | np.ndarray): File path, or float32 mono samples at 16 kHz.
+
+        Returns:
+            str: Transcribed text.
+        """
+        if isinstance(audio, str):
+            audio = whisper.load_audio(audio)
+        audio = np.asarray(audio, dtype=np.float32).flatten()
+        duration = len(audio) / SAMPLE_RATE
+
+        if duration > MAX_CLIP_SECONDS:
+            # Too long for one window: transcribe on its own, taking turns with the batch worker
+            with self._model_lock:
+                return self.model.transcribe(audio, language="en", fp16=False)["text"].strip()
+
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=self.model.dims.n_mels)
+        request = {"mel": mel, "duration": duration, "done": threading.Event(), "text": "", "error": None}
+        self._queue.put(request)
+        request["done"].wait()
+
+        if request["error"] is not None:
+            raise request["error"]
+        return request["text"]
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            start = time.perf_counter()
+            try:
+                mels = torch.stack([request["mel"] for request in batch]).to(self.model.device)
+                with self._model_lock, torch.no_grad():
+                    results = whisper.decode(self.model, mels, self.options)
+
+                for request, result in zip(batch, results):
+                    silent = (result.no_speech_prob > NO_SPEECH_THRESHOLD
+                              and result.avg_logprob < LOGPROB_THRESHOLD)
+                    request["text"] = "" if silent else result.text.strip()
+            except Exception as e:
+                print(f"[❌ Batched transcription error] {e}")
+                for request in batch:
+                    request["error"] = e
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._stats_lock:
+                    self._stats["batches"] += 1
+                    self._stats["clips"] += len(batch)
+                    self._stats["audio_seconds"] += sum(request["duration"] for request in batch)
+                    self._stats["decode_seconds"] += elapsed
+                for request in batch:
+                    request["done"].set()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["max_batch_size"] = self.max_batch_size
+        stats["max_wait_ms"] = round(self.max_wait * 1000)
+        stats["avg_batch_size"] = round(stats["clips"] / stats["batches"], 2) if stats["batches"] else 0.0
+        # Audio-seconds transcribed per wall-second spent decoding
+        stats["throughput_x_realtime"] = (round(stats["audio_seconds"] / stats["decode_seconds"], 2)
+                                          if stats["decode_seconds"] else 0.0)
+        stats["audio_seconds"] = round(stats["audio_seconds"], 2)
+        stats["decode_seconds"] = round(stats["decode_seconds"], 2)
+        return stats
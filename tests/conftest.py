@@ -0,0 +1,8 @@
+# tests/conftest.py
+import os
+import tempfile
+
+# Keep the process-wide stores created at import time out of the working tree
+_scratch = tempfile.mkdtemp(prefix="clifton_tests_")
+for name, directory in (("TTS_CACHE_DIR", "tts_cache"), ("AUDIO_DIR", "audio"), ("SESSION_DIR", "sessions")):
+    os.environ.setdefault(name, os.path.join(_scratch, directory))
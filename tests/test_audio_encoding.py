@@ -0,0 +1,40 @@
+# tests/test_audio_encoding.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import audio_encoding
+
+
+def test_concurrent_requests_encode_a_variant_once(tmp_path, monkeypatch):
+    source = tmp_path / "response_0123.wav"
+    source.write_bytes(b"RIFF" + bytes(64))
+    calls = []
+    guard = threading.Lock()
+
+    def fake_encode(path, target, name):
+        with guard:
+            calls.append(target)
+        time.sleep(0.05)
+        with open(target, "wb") as file:
+            file.write(b"OggS")
+
+    monkeypatch.setattr(audio_encoding, "encode", fake_encode)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: audio_encoding.encoded_variant(str(source), "opus"), range(8)))
+
+    assert calls == [str(source) + ".ogg"]
+    assert set(results) == {(str(source) + ".ogg", "audio/ogg")}
+    assert len(audio_encoding._encode_locks) == 0
+
+
+def test_failed_encoding_serves_the_wav(tmp_path, monkeypatch):
+    source = tmp_path / "response_4567.wav"
+    source.write_bytes(b"RIFF")
+
+    def broken_encode(path, target, name):
+        raise RuntimeError("no encoder")
+
+    monkeypatch.setattr(audio_encoding, "encode", broken_encode)
+    assert audio_encoding.encoded_variant(str(source), "mp3") == (str(source), "audio/wav")
+    assert len(audio_encoding._encode_locks) == 0
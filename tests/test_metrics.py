@@ -0,0 +1,81 @@
+# tests/test_metrics.py
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from metrics import record, render_prometheus, request_breakdown, timed, track_request
+from tts_pipeline import SentencePipeline
+
+
+def test_repeated_stage_is_summed_in_the_breakdown():
+    with track_request() as breakdown:
+        record("test_sum_tts", 0.010)
+        record("test_sum_tts", 0.015)
+        record("test_sum_llm", 0.200)
+        assert request_breakdown() == {"test_sum_tts_ms": 25.0, "test_sum_llm_ms": 200.0}
+    assert breakdown["test_sum_tts_ms"] == 25.0
+    assert request_breakdown() is None
+
+
+def test_untracked_requests_only_feed_the_histograms():
+    with track_request(enabled=False) as breakdown:
+        record("test_untracked", 0.001)
+    assert breakdown is None
+    assert metrics.get_stats()["test_untracked"]["count"] >= 1
+
+
+def test_pool_work_submitted_in_the_request_context_is_counted():
+    with ThreadPoolExecutor(2) as pool, track_request():
+        futures = [pool.submit(contextvars.copy_context().run, record, "test_pool", 0.005) for _ in range(4)]
+        for future in futures:
+            future.result()
+        pool.submit(record, "test_pool_no_context", 0.005).result()
+        stages = request_breakdown()
+    assert stages["test_pool_ms"] == 20.0
+    assert "test_pool_no_context_ms" not in stages
+
+
+def test_sentence_pipeline_tts_lands_in_the_breakdown(tmp_path):
+    def synthesize(text, path):
+        with timed("test_pipeline_tts"):
+            with open(path, "wb") as file:
+                file.write(b"RIFF")
+
+    with track_request():
+        pipeline = SentencePipeline(synthesize, str(tmp_path))
+        pipeline.add_text("Please rest and drink plenty of fluids today. ")
+        pipeline.add_text("Call us again if the fever gets any worse. ")
+        pipeline.finish()
+        segments = list(pipeline.ready_segments(wait=True))
+        stages = request_breakdown()
+    assert segments
+    assert stages["test_pipeline_tts_ms"] > 0
+
+
+def test_prometheus_output():
+    record("test_render", 0.003)
+    record("test_render", 0.3, error=True)
+    text = render_prometheus({"active_requests": 2})
+
+    assert 'clifton_stage_duration_seconds_bucket{stage="test_render",le="0.001"} 0' in text
+    assert 'clifton_stage_duration_seconds_bucket{stage="test_render",le="0.005"} 1' in text
+    assert 'clifton_stage_duration_seconds_bucket{stage="test_render",le="0.5"} 2' in text
+    assert 'clifton_stage_duration_seconds_bucket{stage="test_render",le="+Inf"} 2' in text
+    assert 'clifton_stage_duration_seconds_sum{stage="test_render"} 0.303000' in text
+    assert 'clifton_stage_duration_seconds_count{stage="test_render"} 2' in text
+    assert 'clifton_stage_errors_total{stage="test_render"} 1' in text
+    assert "clifton_active_requests 2" in text
+
+
+def test_concurrent_records_are_not_lost():
+    with track_request():
+        context = contextvars.copy_context()
+        threads = [threading.Thread(target=context.run, args=(lambda: [record("test_race", 0.001)
+                                                                        for _ in range(200)],))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert round(request_breakdown()["test_race_ms"]) == 800
@@ -0,0 +1,62 @@
+# tests/test_streaming_stt.py
+import numpy as np
+
+from audio_io import SAMPLE_RATE
+from streaming_stt import CUT_SEARCH_MS, StreamingTranscriber
+
+
+def tone(seconds, amplitude=0.1):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def recording_decoder(lengths):
+    def transcribe(audio):
+        lengths.append(len(audio) / SAMPLE_RATE)
+        return f"part{len(lengths)}"
+
+    return transcribe
+
+
+def feed_in_chunks(stream, audio, chunk_seconds=0.1):
+    events = []
+    step = int(chunk_seconds * SAMPLE_RATE)
+    for start in range(0, len(audio), step):
+        events.extend(stream.feed(audio[start:start + step]))
+    return events
+
+
+def test_continuous_speech_keeps_every_decode_short():
+    lengths = []
+    stream = StreamingTranscriber(recording_decoder(lengths), window_seconds=5)
+
+    events = feed_in_chunks(stream, tone(25))
+    events += feed_in_chunks(stream, np.zeros(SAMPLE_RATE, dtype=np.float32))
+
+    assert events[-1][0] == "transcript"
+    assert max(lengths) <= 5 + CUT_SEARCH_MS / 1000 + 0.05
+    # Linear, not quadratic: about one partial per second of window-sized audio
+    assert sum(lengths) < 25 * 6
+
+
+def test_pause_closes_the_window():
+    lengths = []
+    stream = StreamingTranscriber(recording_decoder(lengths), window_seconds=2, partial_interval_ms=10 ** 6)
+    audio = np.concatenate([tone(2.5), np.zeros(int(0.1 * SAMPLE_RATE), dtype=np.float32), tone(1),
+                            np.zeros(SAMPLE_RATE, dtype=np.float32)])
+
+    events = feed_in_chunks(stream, audio)
+
+    assert [event for event, _ in events] == ["speech_start", "partial", "transcript"]
+    assert events[-1][1]["user_input"] == "part1 part2"
+    assert abs(lengths[0] - 2.5) < 0.1  # committed at the pause, not cut mid-speech
+
+
+def test_short_noise_is_ignored():
+    lengths = []
+    stream = StreamingTranscriber(recording_decoder(lengths))
+
+    events = feed_in_chunks(stream, np.concatenate([tone(0.1), np.zeros(SAMPLE_RATE, dtype=np.float32)]))
+
+    assert events == [("speech_start", {})]
+    assert lengths == []
@@ -0,0 +1,48 @@
+# tests/test_triage.py
+import numpy as np
+import pytest
+
+import triage
+from triage import EMERGENCY, EMERGENCY_EXAMPLES, ROUTINE, ROUTINE_EXAMPLES, URGENT, classify
+
+
+@pytest.mark.parametrize("text", EMERGENCY_EXAMPLES)
+def test_emergency_examples_match_a_pattern(text):
+    result = classify(text)
+    assert result["severity"] == EMERGENCY
+    assert result["source"] == "pattern"
+
+
+@pytest.mark.parametrize("text", ROUTINE_EXAMPLES)
+def test_routine_examples_match_no_pattern(text):
+    assert classify(text)["severity"] == ROUTINE
+
+
+@pytest.mark.parametrize("text, category", [
+    ("I can't move my left arm", "stroke_symptoms"),
+    ("I cant breathe", "breathing_difficulty"),
+    ("fever since yesterday and now a stiff neck", "high_fever"),
+    ("I had to use my epipen", "severe_allergic_reaction"),
+])
+def test_category_of_match(text, category):
+    assert classify(text)["category"] == category
+
+
+@pytest.fixture
+def centroids(monkeypatch):
+    # Two unit-length stand-in centroids so no embedding model is needed
+    monkeypatch.setattr(triage, "_centroid_categories", ["stroke_symptoms", "high_fever"])
+    monkeypatch.setattr(triage, "_centroids", np.eye(2, 3, dtype=np.float32))
+
+
+def test_similarity_match_is_only_logged_by_default(centroids, monkeypatch):
+    monkeypatch.setattr(triage, "TRIAGE_SIMILARITY_ESCALATION", False)
+    result = classify("my words feel jumbled", embedding=[1.0, 0.0, 0.0])
+    assert result == {"severity": ROUTINE, "category": "stroke_symptoms", "source": "embedding", "score": 1.0}
+
+
+def test_similarity_match_escalates_when_enabled(centroids, monkeypatch):
+    monkeypatch.setattr(triage, "TRIAGE_SIMILARITY_ESCALATION", True)
+    assert classify("my words feel jumbled", embedding=[1.0, 0.0, 0.0])["severity"] == EMERGENCY
+    assert classify("my neck hurts and I feel hot", embedding=[0.0, 0.5, 0.866])["severity"] == URGENT
+    assert classify("what are your visiting hours", embedding=[0.1, 0.2, 0.97])["category"] is None
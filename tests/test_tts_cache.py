@@ -0,0 +1,72 @@
+# tests/test_tts_cache.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tts_cache import TTSCache
+
+
+def slow_synthesis(calls, delay=0.05):
+    """A synthesize(filepath) stand-in that counts its calls and writes a small file"""
+    lock = threading.Lock()
+
+    def synthesize(path):
+        with lock:
+            calls.append(path)
+        time.sleep(delay)
+        with open(path, "wb") as file:
+            file.write(b"RIFF" + bytes(64))
+
+    return synthesize
+
+
+def test_concurrent_misses_synthesize_once(tmp_path):
+    cache = TTSCache(directory=str(tmp_path), admit_after=1)
+    calls = []
+    synthesize = slow_synthesis(calls)
+
+    with ThreadPoolExecutor(8) as pool:
+        paths = list(pool.map(lambda _: cache.synthesize("Please call 911.", synthesize), range(8)))
+
+    assert len(calls) == 1
+    assert len(set(paths)) == 1
+    assert len(cache._key_locks) == 0
+
+
+def test_late_caller_waits_for_the_synthesis_in_flight(tmp_path):
+    # Texts not admitted yet are synthesized every time, but never two at once
+    cache = TTSCache(directory=str(tmp_path), admit_after=100)
+    active, overlaps = [0], []
+    guard = threading.Lock()
+
+    def synthesize(path):
+        with guard:
+            active[0] += 1
+            overlaps.append(active[0] > 1)
+        time.sleep(0.02)
+        with open(path, "wb") as file:
+            file.write(b"RIFF")
+        with guard:
+            active[0] -= 1
+
+    def call(i):
+        time.sleep(0.005 * i)  # arrive while others hold or wait for the key
+        return cache.synthesize("One moment please.", synthesize, path=str(tmp_path / f"reply_{i}.wav"))
+
+    with ThreadPoolExecutor(6) as pool:
+        results = list(pool.map(call, range(6)))
+
+    assert all(results)
+    assert len(overlaps) == 6 and not any(overlaps)
+    assert len(cache._key_locks) == 0
+
+
+def test_hits_skip_synthesis(tmp_path):
+    cache = TTSCache(directory=str(tmp_path), admit_after=1)
+    calls = []
+    synthesize = slow_synthesis(calls, delay=0)
+
+    first = cache.synthesize("Hello.", synthesize)
+    assert cache.synthesize("Hello.", synthesize) == first == cache.get("Hello.")
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 2
@@ -0,0 +1,217 @@
+# triage.py
+import os
+import re
+import threading
+
+import numpy as np
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# === Configuration ===
+# Cosine similarity to an emergency centroid that counts as an emergency / as urgent.
+# Not calibrated yet: these are rough starting points for all-MiniLM-L6-v2 (paraphrases
+# usually score 0.5-0.8, unrelated sentences below 0.3). Run `python triage.py` to score
+# the labelled examples below with the configured model, set these from its output and
+# record the scores here before turning on TRIAGE_SIMILARITY_ESCALATION.
+TRIAGE_EMERGENCY_SIMILARITY = float(os.getenv("TRIAGE_EMERGENCY_SIMILARITY", "0.6"))
+TRIAGE_URGENT_SIMILARITY = float(os.getenv("TRIAGE_URGENT_SIMILARITY", "0.45"))
+# Let a centroid match raise the severity; off, it is only reported (and logged) as routine
+TRIAGE_SIMILARITY_ESCALATION = os.getenv("TRIAGE_SIMILARITY_ESCALATION", "0") == "1"
+
+EMERGENCY = "emergency"
+URGENT = "urgent"
+ROUTINE = "routine"
+
+# "can't" as typed or transcribed: can't, cant, cannot, can not
+CANT = r"(?:can'?t|can ?not)"
+WONT = r"(?:won'?t|will not)"
+
+# Phrasings of each emergency, keyed by the category of the matching SERIOUS: entry in
+# MEDICAL_KNOWLEDGE. Patterns are matched case-insensitively on word boundaries.
+EMERGENCY_PATTERNS = {
+    "serious_chest_pain": [
+        r"chest pains?", r"heart attack", r"chest (?:feels|is|getting) (?:very )?(?:tight|heavy|crushed|squeezed)",
+        r"(?:tightness|pressure|heaviness|squeezing) (?:in|on) (?:my )?chest",
+        r"pain (?:in|down|spreading to|radiating to) (?:my )?(?:left )?(?:arm|jaw)",
+    ],
+    "serious_abdominal_pain": [
+        r"(?:severe|extreme|unbearable|intense) (?:abdominal|stomach|belly|tummy) pain", r"appendicitis",
+        r"(?:stomach|belly|abdomen) (?:is )?(?:killing me|hurts? (?:so|really) bad)",
+    ],
+    "breathing_difficulty": [
+        CANT + r" breathe?", r"(?:difficulty|trouble|struggling|hard) breathing", r"hard to breathe",
+        r"short(?:ness)? of breath", r"gasping(?: for air)?", r"choking", CANT + r" catch my breath",
+    ],
+    "high_fever": [
+        r"high fever", r"fever (?:of|over|above) 10[3-9]", r"10[4-9] (?:degrees?|fever)",
+        # A stiff neck alone is usually a bad night's sleep; with a fever it may be meningitis
+        r"(?:fever|temperature)[^.?!]{0,40}\bstiff neck", r"stiff neck[^.?!]{0,40}\b(?:fever|temperature)",
+    ],
+    "severe_allergic_reaction": [
+        r"severe allergic reaction", r"anaphyla(?:xis|ctic)",
+        # Using an EpiPen is an emergency, asking for a prescription is not
+        r"(?:used|had to use|gave (?:him|her|them)) (?:my |his |her |their |an? )?epi ?pen",
+        r"need (?:my |his |her |their |an? )?epi ?pen (?:now|right now|immediately)",
+        r"(?:throat|tongue|lips?|face) (?:is |are )?(?:swelling|swollen|closing)",
+        r"swollen (?:throat|tongue|lips?|face)",
+    ],
+    "head_injury": [
+        r"head injury", r"hit (?:my|his|her|their) head", r"(?:passed|blacked) out", r"knocked out",
+        r"unconscious", r"lost consciousness", r"not (?:waking up|responding)",
+    ],
+    "serious_injuries": [
+        r"bleeding (?:heavily|a lot|badly|profusely)", r"heavy bleeding", f"(?:{WONT}|{CANT}) stop bleeding",
+        r"deep (?:cut|wound)", r"severe burns?", r"broken bone sticking out",
+    ],
+    "stroke_symptoms": [
+        # Not "had a stroke": a past stroke is history, not an emergency
+        r"(?:having|is having) a stroke", r"signs? of (?:a )?stroke", r"stroke symptoms",
+        r"(?:face|mouth) (?:is )?drooping", r"slurred speech", CANT + r" (?:speak|talk) properly",
+        r"sudden (?:weakness|numbness|confusion)",
+        CANT + r" (?:move|feel) (?:my |his |her |their |one )?(?:left |right )?(?:arms?|legs?|face|side|hands?)",
+        r"numb on one side",
+    ],
+    "general_emergency": [
+        # Severe pain alone (after surgery, a toothache) is routine; the serious kinds have their own patterns
+        r"(?:this is|it's|it is|having) an? (?:medical )?emergency", r"medical emergency",
+        r"sudden(?:,? | and )severe headache", r"worst headache", r"suicid(?:e|al)", r"overdose",
+    ],
+}
+
+
+def _compile(patterns):
+    """One alternation with a named group per category, so a single scan finds the first emergency"""
+    groups = [f"(?P<{category}>{'|'.join(phrases)})" for category, phrases in patterns.items()]
+    return re.compile(r"\b(?:" + "|".join(groups) + r")\b", re.IGNORECASE)
+
+
+EMERGENCY_REGEX = _compile(EMERGENCY_PATTERNS)
+
+# Unit-length embeddings of the SERIOUS: knowledge entries, built on first use
+_centroids = None
+_centroid_categories = []
+_centroid_lock = threading.Lock()
+
+
+def get_centroids():
+    """
+    Return (categories, matrix) of emergency centroids, computing them on first use.
+
+    Each SERIOUS: entry in MEDICAL_KNOWLEDGE is split into sentences; the
+    centroid of a category is the normalized mean of their embeddings.
+    """
+    global _centroids, _centroid_categories
+
+    if _centroids is not None:
+        return _centroid_categories, _centroids
+
+    with _centroid_lock:
+        if _centroids is None:
+            from embedding_service import encode
+            from medical_knowledge import MEDICAL_KNOWLEDGE
+
+            categories, centroids = [], []
+            for item in MEDICAL_KNOWLEDGE:
+                if not item["text"].startswith("SERIOUS:"):
+                    continue
+                sentences = [sentence.strip() for sentence in item["text"][len("SERIOUS:"):].split(". ")
+                             if sentence.strip()]
+                vectors = _normalize(encode(sentences))
+                categories.append(item["category"])
+                centroids.append(vectors.mean(axis=0))
+            _centroid_categories = categories
+            _centroids = _normalize(np.asarray(centroids, dtype=np.float32))
+    return _centroid_categories, _centroids
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def classify(query, embedding=None):
+    """
+    Triage a patient message.
+
+    The compiled emergency patterns are checked first; without a match, and
+    when the query embedding is given, it is scored against the emergency
+    centroids (one 8 x 384 matrix-vector product). Unless
+    TRIAGE_SIMILARITY_ESCALATION is on, a centroid match stays routine and
+    only its category and score are reported, for logging.
+
+    Args:
+        query (str): The patient's message.
+        embedding (array-like, optional): Its sentence embedding, as used for retrieval.
+
+    Returns:
+        dict: severity (emergency, urgent or routine), category (None when
+        nothing matched), source (pattern, embedding or None) and score
+        (centroid similarity, or None for a pattern match).
+    """
+    match = EMERGENCY_REGEX.search(query.replace("’", "'"))
+    if match:
+        return {"severity": EMERGENCY, "category": match.lastgroup, "source": "pattern", "score": None}
+
+    if embedding is not None:
+        categories, centroids = get_centroids()
+        scores = centroids @ _normalize(np.asarray(embedding, dtype=np.float32).ravel())
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        if score >= TRIAGE_URGENT_SIMILARITY:
+            severity = EMERGENCY if score >= TRIAGE_EMERGENCY_SIMILARITY else URGENT
+            if not TRIAGE_SIMILARITY_ESCALATION:
+                severity = ROUTINE
+            return {"severity": severity, "category": categories[best], "source": "embedding",
+                    "score": round(score, 3)}
+
+    return {"severity": ROUTINE, "category": None, "source": None, "score": None}
+
+
+# Self-check for the patterns and calibration data for the similarity thresholds
+EMERGENCY_EXAMPLES = [
+    "my chest feels tight", "I cant breathe", "I can’t catch my breath", "my dad is having a stroke",
+    "her face is drooping and her speech is slurred", "I hit my head and passed out", "his lips are swollen",
+    "fever of 104 and a stiff neck", "my stomach is killing me", "it won't stop bleeding",
+    "this is an emergency", "I think I'm having a heart attack", "I can't move my left arm",
+    "I have a high temperature and a stiff neck", "I just used my epipen", "I think he is having a stroke",
+]
+ROUTINE_EXAMPLES = [
+    "that was a stroke of luck", "is heat stroke common in summer", "what is your emergency contact number",
+    "where is the emergency department", "I have a mild headache", "I have a runny nose and a cold",
+    "I can't make my appointment on Monday", "book an appointment with Dr. Malik",
+    "my son needs his vaccinations", "what are your visiting hours",
+    "I can't move my appointment to Friday", "I have a stiff neck from sleeping",
+    "can i get an epipen prescription refill", "I had a stroke last year, can I book a checkup",
+    "severe pain after dental surgery",
+]
+
+
+if __name__ == "__main__":
+    failures = [text for text in EMERGENCY_EXAMPLES if classify(text)["source"] != "pattern"]
+    failures += [text for text in ROUTINE_EXAMPLES if classify(text)["source"] == "pattern"]
+    for text in failures:
+        print(f"❌ Pattern misclassified: {text!r} -> {classify(text)}")
+    print(f"✅ {len(EMERGENCY_EXAMPLES) + len(ROUTINE_EXAMPLES) - len(failures)} of "
+          f"{len(EMERGENCY_EXAMPLES) + len(ROUTINE_EXAMPLES)} example phrases classified correctly by the patterns")
+
+    # Similarity of each example to its nearest emergency centroid, ignoring the patterns
+    from embedding_service import encode
+
+    try:
+        categories, centroids = get_centroids()
+    except Exception as e:
+        raise SystemExit(f"⚠️ Embedding model unavailable, can't score the examples: {e}")
+    for label, examples in (("emergency", EMERGENCY_EXAMPLES), ("routine", ROUTINE_EXAMPLES)):
+        scores = (_normalize(encode(examples)) @ centroids.T).max(axis=1)
+        print(f"\n{label} examples: min {scores.min():.3f}, max {scores.max():.3f}")
+        for text, score in zip(examples, scores):
+            print(f"   {score:.3f}  {text}")
+        if label == "emergency":
+            lowest_emergency = scores.min()
+        else:
+            highest_routine = scores.max()
+    print(f"\nSuggested TRIAGE_URGENT_SIMILARITY ≈ {highest_routine + 0.02:.2f} (just above every routine example), "
+          f"TRIAGE_EMERGENCY_SIMILARITY ≈ {max(lowest_emergency, highest_routine + 0.05):.2f}")
+    print(f"Configured: urgent {TRIAGE_URGENT_SIMILARITY}, emergency {TRIAGE_EMERGENCY_SIMILARITY}")
@@ -1,30 +1,125 @@
-from TTS.api import TTS
-import pygame
 import os
+import tempfile
+import threading
 import time
 
-# Initialize TTS model (download if not exists)
+from tts_pipeline import SentencePipeline
+from tts_cache import tts_cache, TTS_MODEL_NAME
+from startup import loading
+
+# TTS model is loaded on first use (downloaded if it doesn't exist yet)
 # This model is good for human-like speech and relatively fast
 
 os.environ["USE_CPU"] = "True"
-tts_model = TTS(model_name="tts_models/en/ljspeech/tacotron2-DDC", progress_bar=False, gpu=False)
+_tts_model = None
+_tts_model_lock = threading.Lock()
 
-def speak(text):
-    filename = "temp_coqui.wav"
-    tts_model.tts_to_file(text=text, file_path=filename)
+# Set to stop playback of any remaining sentences (e.g. on barge-in)
+stop_event = threading.Event()
+
+
+def get_tts_model():
+    """Return the shared Coqui TTS model, loading it on first use"""
+    global _tts_model
+
+    if _tts_model is not None:
+        return _tts_model
+
+    with _tts_model_lock:
+        if _tts_model is None:
+            from TTS.api import TTS
+
+            with loading("tts"):
+                _tts_model = TTS(model_name=TTS_MODEL_NAME, progress_bar=False, gpu=False)
+    return _tts_model
+
+
+def _synthesize(text, filepath):
+    """Return cached audio for text, synthesizing it into the cache on a miss"""
+    return tts_cache.synthesize(text, lambda path: get_tts_model().tts_to_file(text=text, file_path=path),
+                                path=filepath)
+
+
+def _play(filename):
+    import pygame
 
-    pygame.mixer.init()
     pygame.mixer.music.load(filename)
     pygame.mixer.music.play()
 
     while pygame.mixer.music.get_busy():
+        if stop_event.is_set():
+            pygame.mixer.music.stop()
+            break
         time.sleep(0.1)
 
-    pygame.mixer.quit()
 
+def _play_segments(pipeline, done_feeding):
+    """Play synthesized segments in order until the pipeline is drained"""
+    while True:
+        finished = done_feeding.is_set()
+        for segment in pipeline.ready_segments(wait=finished):
+            if not stop_event.is_set():
+                _play(segment["path"])
+            if not segment["shared"]:
+                _remove(segment["path"])
+        if finished:
+            return
+        time.sleep(0.05)
+
+
+def speak_stream(chunks):
+    """
+    Speak text as it streams in, one sentence at a time.
+
+    Each sentence is synthesized on a background worker and played on another
+    while the next one is still being generated by the LLM.
+
+    Args:
+        chunks (iterable[str]): Text chunks, e.g. from agent.stream_response.
+
+    Returns:
+        str: The full text that was received.
+    """
+    stop_event.clear()
+    pipeline = SentencePipeline(_synthesize, tempfile.gettempdir())
+    done_feeding = threading.Event()
+    received = []
+
+    import pygame
+
+    pygame.mixer.init()
+    player = threading.Thread(target=_play_segments, args=(pipeline, done_feeding), daemon=True)
+    player.start()
+    try:
+        for chunk in chunks:
+            received.append(chunk)
+            if not stop_event.is_set():
+                pipeline.add_text(chunk)
+    finally:
+        if stop_event.is_set():
+            pipeline.cancel()
+        else:
+            pipeline.finish()
+        done_feeding.set()
+        player.join()
+        pygame.mixer.quit()
+
+    if pipeline.first_audio_ms is not None:
+        print(f"⏱️ First audio after {pipeline.first_audio_ms:.0f}ms")
+    return "".join(received)
+
+
+def speak(text):
+    speak_stream([text])
+
+
+def stop_speaking():
+    """Stop the current and any queued sentences"""
+    stop_event.set()
+
+
+def _remove(filename):
     try:
         os.remove(filename)
     except Exception as e:
         print(f"⚠️ Could not delete {filename}: {e}")
-
-
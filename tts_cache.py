@@ -0,0 +1,248 @@
+# tts_cache.py
+import glob
+import hashlib
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+from scheduler import KeyedLocks
+from tts_pipeline import SentenceSplitter
+
+# Load environment variables
+load_dotenv()
+
+# === Configuration ===
+TTS_MODEL_NAME = os.getenv("TTS_MODEL_NAME", "tts_models/en/ljspeech/tacotron2-DDC")
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "200"))
+# Phrases synthesized at startup, one per line (fallback messages, greetings, referrals, ...)
+TTS_CACHE_PHRASES_FILE = os.getenv("TTS_CACHE_PHRASES_FILE", "tts_phrases.txt")
+# Times a text must be synthesized before it is cached, so one-off sentences don't churn the cache
+TTS_CACHE_ADMIT_AFTER = int(os.getenv("TTS_CACHE_ADMIT_AFTER", "2"))
+
+CACHE_PREFIX = "tts_"
+SEEN_KEYS = 10000  # how many uncached texts are remembered for admission
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different renderings share an entry"""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def cache_key(text, voice=TTS_MODEL_NAME):
+    """Content address for the audio of text spoken by voice"""
+    return hashlib.sha256(f"{voice}\0{normalize_text(text)}".encode("utf-8")).hexdigest()[:32]
+
+
+def load_phrases(path=TTS_CACHE_PHRASES_FILE):
+    """Read the pre-warm phrase list, ignoring blank lines and # comments"""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as file:
+        return [line.strip() for line in file if line.strip() and not line.startswith("#")]
+
+
+class TTSCache:
+    """
+    Content-addressed on-disk cache of synthesized speech.
+
+    Files are named tts_<sha256(voice, text)>.wav, so a hit can be served as
+    is. Entries are evicted least-recently-used first once the directory
+    grows past max_bytes; recency survives restarts through file mtimes.
+    Text is only admitted once it has been synthesized admit_after times.
+    Several processes can share the directory: clips written by another
+    process are adopted on lookup.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=int(TTS_CACHE_MAX_MB * 1024 * 1024), voice=TTS_MODEL_NAME,
+                 admit_after=TTS_CACHE_ADMIT_AFTER):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.voice = voice
+        self.admit_after = admit_after
+        self._entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self._seen = OrderedDict()  # key -> times synthesized without being cached
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = KeyedLocks()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        existing = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".tmp.wav"):
+                # Left over from a synthesis interrupted by a crash
+                os.remove(os.path.join(self.directory, name))
+            elif name.startswith(CACHE_PREFIX) and name.endswith(".wav"):
+                stat = os.stat(os.path.join(self.directory, name))
+                existing.append((stat.st_mtime, name[len(CACHE_PREFIX):-4], stat.st_size))
+        for _, key, size in sorted(existing):
+            self._entries[key] = size
+            self._bytes += size
+
+    def filename(self, key):
+        return f"{CACHE_PREFIX}{key}.wav"
+
+    def path(self, key):
+        return os.path.join(self.directory, self.filename(key))
+
+    def lookup(self, filename):
+        """Path of a cached file by its served name, or None"""
+        if not (filename.startswith(CACHE_PREFIX) and filename.endswith(".wav")):
+            return None
+        key = filename[len(CACHE_PREFIX):-4]
+        path = self.path(key)
+        with self._lock:
+            if key not in self._entries and not self._adopt(key):
+                return None
+            self._entries.move_to_end(key)
+        return path if os.path.exists(path) else None
+
+    def get(self, text):
+        """Path of the cached audio for text, or None on a miss"""
+        return self._fetch(cache_key(text, self.voice))
+
+    def _fetch(self, key, count=True):
+        path = self.path(key)
+        with self._lock:
+            hit = (key in self._entries or self._adopt(key)) and os.path.exists(path)
+            if hit:
+                self._entries.move_to_end(key)
+            elif key in self._entries:
+                # Removed behind our back
+                self._bytes -= self._entries.pop(key)
+            if count:
+                if hit:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        if not hit:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def synthesize(self, text, synthesize, count=True, path=None):
+        """
+        Return the cached audio path for text, synthesizing it on a miss.
+
+        Concurrent misses for the same text wait for a single synthesis.
+
+        Args:
+            synthesize (callable): synthesize(filepath) writing a WAV file.
+            path (str, optional): Where to write audio that is not admitted to
+                the cache yet. Without it, misses are always cached.
+
+        Returns:
+            str | None: Path of the audio, or None if synthesis produced no file.
+        """
+        key = cache_key(text, self.voice)
+        with self._key_locks.hold(key):
+            cached = self._fetch(key, count)
+            if cached is not None:
+                return cached
+
+            if path is not None and not self._admit(key):
+                synthesize(path)
+                return path if os.path.exists(path) else None
+
+            tmp_path = os.path.join(self.directory, f".{key}.{uuid.uuid4().hex}.tmp.wav")
+            try:
+                synthesize(tmp_path)
+                if not os.path.exists(tmp_path):
+                    return None
+                return self._add(key, tmp_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def _adopt(self, key):
+        """Track a clip another process added to the shared directory; call with the lock held"""
+        try:
+            size = os.path.getsize(self.path(key))
+        except OSError:
+            return False
+        self._entries[key] = size
+        self._bytes += size
+        return True
+
+    def _admit(self, key):
+        """Count a synthesis of key; True once it has been seen often enough to cache"""
+        with self._lock:
+            seen = self._seen.pop(key, 0) + 1
+            if seen >= self.admit_after:
+                return True
+            self._seen[key] = seen
+            while len(self._seen) > SEEN_KEYS:
+                self._seen.popitem(last=False)
+            return False
+
+    def _add(self, key, tmp_path):
+        size = os.path.getsize(tmp_path)
+        path = self.path(key)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, old_size = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                self.evictions += 1
+                # Also drop any compressed variants encoded for serving
+                for stale in [self.path(old_key)] + glob.glob(glob.escape(self.path(old_key)) + ".*"):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+        return path
+
+    def prewarm(self, phrases, synthesize):
+        """
+        Synthesize phrases that are not cached yet.
+
+        Each phrase is cached whole (for /process_voice) and sentence by
+        sentence, matching how streamed replies are split for synthesis.
+
+        Args:
+            synthesize (callable): synthesize(text, filepath) writing a WAV file.
+
+        Returns:
+            int: Number of clips synthesized (stops at the first failure).
+        """
+        added = 0
+        for phrase in phrases:
+            splitter = SentenceSplitter()
+            sentences = splitter.feed(phrase + " ") + splitter.flush()
+            for text in dict.fromkeys([phrase] + sentences):
+                if self._fetch(cache_key(text, self.voice), count=False) is not None:
+                    continue
+                if self.synthesize(text, lambda path, text=text: synthesize(text, path), count=False) is None:
+                    return added
+                added += 1
+        return added
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+# Process-wide cache shared by the server and the local voice loop
+tts_cache = TTSCache()
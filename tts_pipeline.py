@@ -0,0 +1,163 @@
+# tts_pipeline.py
+import contextvars
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+
+# Abbreviations whose trailing period does not end a sentence
+ABBREVIATIONS = {"dr", "mr", "mrs", "ms", "st", "vs", "etc", "e.g", "i.e", "no", "approx"}
+
+# Sentence end: . ! ? (optionally followed by quotes/brackets) and then whitespace
+_SENTENCE_END = re.compile(r"""([.!?]+["')\]]*)\s+|\n+""")
+
+# Very short fragments sound choppy on their own, so they are merged with the next sentence
+MIN_SENTENCE_CHARS = 20
+
+# Running time-to-first-audio statistics across requests
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "last_ttfa_ms": None, "avg_ttfa_ms": None}
+
+
+class SentenceSplitter:
+    """Incrementally split streamed text into complete sentences"""
+
+    def __init__(self, min_chars=MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text):
+        """Add a chunk of text and return any sentences it completed"""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            last_word = candidate.rstrip(".!?\"')] ").rsplit(" ", 1)[-1].lower()
+            if last_word in ABBREVIATIONS or len(candidate) < self.min_chars:
+                continue  # keep accumulating into the same sentence
+            sentences.append(candidate)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Return whatever text is left once the stream has ended"""
+        remainder, self._buffer = self._buffer.strip(), ""
+        return [remainder] if remainder else []
+
+
+class SentencePipeline:
+    """
+    Synthesize a reply sentence by sentence while it is still being generated.
+
+    Text is fed in as it streams from the LLM; each completed sentence is
+    synthesized on a background worker into its own WAV segment, so the first
+    segment can be played while later sentences are still being generated.
+    """
+
+    def __init__(self, synthesize, output_dir, start_time=None):
+        """
+        Args:
+            synthesize (callable): synthesize(text, filepath) writing a WAV file.
+                It may instead return the path of existing audio (e.g. a
+                cache hit), which is then used for the segment as is.
+            output_dir (str): Directory for the segment files.
+            start_time (float, optional): time.perf_counter() value that
+                time-to-first-audio is measured from (defaults to now).
+        """
+        self.synthesize = synthesize
+        self.output_dir = output_dir
+        self.start_time = start_time if start_time is not None else time.perf_counter()
+        self.prefix = f"segment_{uuid.uuid4().hex}"
+        self.segments = []
+        self.first_audio_ms = None
+        self._splitter = SentenceSplitter()
+        self._queue = queue.Queue()
+        self._next_ready = 0
+        self._cancelled = False
+        # The worker runs in the creator's context so its TTS timings count towards that request
+        self._worker = threading.Thread(target=contextvars.copy_context().run, args=(self._run,), daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            segment = self._queue.get()
+            if segment is None:
+                return
+            if not self._cancelled:
+                try:
+                    path = self.synthesize(segment["text"], segment["path"])
+                    if isinstance(path, str) and path != segment["path"]:
+                        segment.update(path=path, filename=os.path.basename(path), shared=True)
+                    segment["ok"] = os.path.exists(segment["path"])
+                except Exception as e:
+                    print(f"TTS segment error: {e}")
+                if segment["ok"] and self.first_audio_ms is None:
+                    self.first_audio_ms = (time.perf_counter() - self.start_time) * 1000
+            segment["ready"].set()
+
+    def _submit(self, sentence):
+        index = len(self.segments)
+        segment = {
+            "index": index,
+            "text": sentence,
+            "filename": f"{self.prefix}_{index:03d}.wav",
+            "ok": False,
+            "shared": False,  # True when the audio belongs to someone else (don't delete it)
+            "ready": threading.Event(),
+        }
+        segment["path"] = os.path.join(self.output_dir, segment["filename"])
+        self.segments.append(segment)
+        self._queue.put(segment)
+
+    def add_text(self, text):
+        """Feed streamed text; completed sentences are queued for synthesis"""
+        for sentence in self._splitter.feed(text):
+            self._submit(sentence)
+
+    def finish(self):
+        """Queue the remaining text and let the worker exit once it is done"""
+        for sentence in self._splitter.flush():
+            self._submit(sentence)
+        self._queue.put(None)
+
+    def cancel(self):
+        """Skip synthesis of anything still queued (e.g. the client went away)"""
+        self._cancelled = True
+        self._queue.put(None)
+
+    def ready_segments(self, wait=False):
+        """
+        Yield newly synthesized segments in order.
+
+        With wait=False only segments that are already done are yielded; with
+        wait=True this blocks until every queued segment has been synthesized
+        (call finish() first).
+        """
+        while self._next_ready < len(self.segments):
+            segment = self.segments[self._next_ready]
+            if not wait and not segment["ready"].is_set():
+                return
+            segment["ready"].wait()
+            self._next_ready += 1
+            if segment["ok"]:
+                yield segment
+
+    def record_stats(self):
+        """Fold this reply's time-to-first-audio into the running statistics"""
+        if self.first_audio_ms is None:
+            return
+        with _stats_lock:
+            count = _stats["requests"]
+            average = _stats["avg_ttfa_ms"] or 0.0
+            _stats["requests"] = count + 1
+            _stats["last_ttfa_ms"] = round(self.first_audio_ms, 1)
+            _stats["avg_ttfa_ms"] = round((average * count + self.first_audio_ms) / (count + 1), 1)
+
+
+def get_stats():
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,286 @@
+# vector_store.py
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+from dotenv import load_dotenv
+
+from embedding_service import EMBEDDING_DIMENSION, EMBEDDING_MODEL_NAME
+from startup import loading
+
+# Load environment variables
+load_dotenv()
+
+# === Configuration ===
+# "pinecone" uses the hosted index and falls back to the local one if it can't connect,
+# "local" always uses the in-process NumPy index
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "vector_index")
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))
+FETCH_BATCH_SIZE = 100  # keeps Pinecone fetch requests under URL length limits
+
+VECTORS_FILE = "vectors.npy"
+METADATA_FILE = "metadata.json"
+
+# Metadata fields that get a vectorized column for fast filtering
+FILTER_FIELDS = ("source", "category")
+
+
+class LocalVectorIndex:
+    """
+    In-process cosine-similarity index with a Pinecone-compatible interface.
+
+    Embeddings are kept L2-normalized in a single float32 matrix so a query is
+    one matrix-vector product. The matrix is persisted as ``vectors.npy`` (opened
+    memory-mapped on load) with ids and metadata in a ``metadata.json`` sidecar.
+    """
+
+    def __init__(self, directory=LOCAL_INDEX_DIR, dimension=EMBEDDING_DIMENSION, autosave=True):
+        self.directory = directory
+        self.dimension = dimension
+        self.autosave = autosave
+        self._lock = threading.Lock()
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._ids = []
+        self._metadata = []
+        self._positions = {}
+        self._columns = {}
+        self._load()
+
+    # === Persistence ===
+    def _load(self):
+        vectors_path = os.path.join(self.directory, VECTORS_FILE)
+        metadata_path = os.path.join(self.directory, METADATA_FILE)
+        if not (os.path.exists(vectors_path) and os.path.exists(metadata_path)):
+            return
+
+        try:
+            with open(metadata_path, "r", encoding="utf-8") as file:
+                sidecar = json.load(file)
+            vectors = np.load(vectors_path, mmap_mode="r")
+            if vectors.shape[0] != len(sidecar["ids"]):
+                raise ValueError("vector and metadata counts differ")
+        except (OSError, ValueError, KeyError, json.JSONDecodeError) as e:
+            print(f"[⚠️ Local index at {self.directory} is unreadable, starting empty] {e}")
+            return
+
+        self._vectors = vectors
+        self._ids = list(sidecar["ids"])
+        self._metadata = list(sidecar["metadata"])
+        self._positions = {vector_id: i for i, vector_id in enumerate(self._ids)}
+        self._rebuild_columns()
+        print(f"✅ Local vector index loaded ({len(self._ids)} vectors from {self.directory})")
+
+    def persist(self):
+        """Write the matrix and metadata sidecar to disk"""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            vectors_path = os.path.join(self.directory, VECTORS_FILE)
+            metadata_path = os.path.join(self.directory, METADATA_FILE)
+
+            # Write to temp files first so a crash never leaves a half-written index
+            np.save(vectors_path + ".tmp.npy", np.ascontiguousarray(self._vectors))
+            with open(metadata_path + ".tmp", "w", encoding="utf-8") as file:
+                json.dump({"ids": self._ids, "metadata": self._metadata}, file)
+            os.replace(vectors_path + ".tmp.npy", vectors_path)
+            os.replace(metadata_path + ".tmp", metadata_path)
+
+    def _rebuild_columns(self):
+        self._columns = {
+            field: np.array([meta.get(field) for meta in self._metadata], dtype=object)
+            for field in FILTER_FIELDS
+        }
+
+    # === Pinecone-compatible API ===
+    def upsert(self, vectors=None, **kwargs):
+        """Insert or replace vectors given as (id, values, metadata) tuples or dicts"""
+        items = []
+        for vector in vectors or []:
+            if isinstance(vector, dict):
+                items.append((vector["id"], vector["values"], vector.get("metadata", {})))
+            else:
+                vector_id, values = vector[0], vector[1]
+                items.append((vector_id, values, vector[2] if len(vector) > 2 else {}))
+
+        if not items:
+            return {"upserted_count": 0}
+
+        new_vectors = np.asarray([values for _, values, _ in items], dtype=np.float32)
+        norms = np.linalg.norm(new_vectors, axis=1, keepdims=True)
+        new_vectors /= np.maximum(norms, 1e-12)
+
+        with self._lock:
+            # Build new copies and swap them in at the end so concurrent queries
+            # always see a consistent snapshot (this also copies out of the memory map)
+            matrix = np.array(self._vectors, dtype=np.float32)
+            ids, all_metadata, positions = list(self._ids), list(self._metadata), dict(self._positions)
+            appended = []
+            for row, (vector_id, _, metadata) in zip(new_vectors, items):
+                position = positions.get(vector_id)
+                if position is None:
+                    positions[vector_id] = len(ids)
+                    appended.append(row)
+                    ids.append(vector_id)
+                    all_metadata.append(dict(metadata))
+                else:
+                    matrix[position] = row
+                    all_metadata[position] = dict(metadata)
+
+            if appended:
+                matrix = np.vstack([matrix, np.asarray(appended, dtype=np.float32)])
+            self._ids, self._metadata, self._positions = ids, all_metadata, positions
+            self._rebuild_columns()
+            self._vectors = matrix
+
+        if self.autosave:
+            self.persist()
+        return {"upserted_count": len(items)}
+
+    def fetch(self, ids, **kwargs):
+        """Return the stored vectors for the given ids that exist in the index"""
+        found = {}
+        with self._lock:
+            for vector_id in ids:
+                position = self._positions.get(vector_id)
+                if position is not None:
+                    found[vector_id] = {
+                        "id": vector_id,
+                        "values": self._vectors[position].tolist(),
+                        "metadata": self._metadata[position],
+                    }
+        return {"vectors": found}
+
+    def query(self, vector, top_k=10, include_metadata=False, filter=None, **kwargs):
+        """Return the top_k most similar vectors by cosine similarity"""
+        # upsert swaps in new objects rather than mutating, so grabbing references is enough
+        with self._lock:
+            vectors, ids, metadata, columns = self._vectors, self._ids, self._metadata, self._columns
+        if len(ids) == 0:
+            return {"matches": []}
+
+        query_vector = np.array(vector, dtype=np.float32)
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+        scores = vectors @ query_vector
+
+        if filter:
+            mask = self._filter_mask(filter, columns, metadata)
+            scores = np.where(mask, scores, -np.inf)
+            top_k = min(top_k, int(mask.sum()))
+        top_k = min(top_k, len(ids))
+        if top_k <= 0:
+            return {"matches": []}
+
+        # argpartition finds the top_k in linear time, then only those are sorted
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        ranked = candidates[np.argsort(-scores[candidates])]
+
+        matches = []
+        for position in ranked:
+            match = {"id": ids[position], "score": float(scores[position])}
+            if include_metadata:
+                match["metadata"] = metadata[position]
+            matches.append(match)
+        return {"matches": matches}
+
+    def describe_index_stats(self, **kwargs):
+        return {"dimension": self.dimension, "total_vector_count": len(self._ids)}
+
+    @staticmethod
+    def _filter_mask(filter, columns, metadata):
+        """Build a boolean mask for Pinecone-style equality / $eq / $in filters"""
+        mask = np.ones(len(metadata), dtype=bool)
+        for field, condition in filter.items():
+            column = columns.get(field)
+            if column is None:
+                column = np.array([meta.get(field) for meta in metadata], dtype=object)
+
+            if isinstance(condition, dict):
+                if "$eq" in condition:
+                    mask &= column == condition["$eq"]
+                elif "$in" in condition:
+                    mask &= np.isin(column, list(condition["$in"]))
+                else:
+                    raise ValueError(f"Unsupported filter operator in {condition}")
+            else:
+                mask &= column == condition
+        return mask
+
+
+# === Ingestion helpers ===
+def content_id(text, *parts):
+    """
+    Derive a stable vector ID from the text and embedding model.
+
+    Re-ingesting unchanged content yields the same ID, so it overwrites rather
+    than duplicates; extra parts (e.g. category) are folded into the hash.
+    """
+    digest = hashlib.sha256()
+    for part in (EMBEDDING_MODEL_NAME, *parts, text):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()[:32]
+
+
+def fetch_existing_ids(index, ids, batch_size=FETCH_BATCH_SIZE):
+    """Return the subset of ids already present in the index"""
+    existing = set()
+    for start in range(0, len(ids), batch_size):
+        response = index.fetch(ids=ids[start:start + batch_size])
+        # Pinecone returns a FetchResponse object, the local index a plain dict
+        vectors = response["vectors"] if isinstance(response, dict) else response.vectors
+        existing.update(vectors.keys())
+    return existing
+
+
+def upsert_in_batches(index, vectors, batch_size=UPSERT_BATCH_SIZE):
+    """Upsert (id, values, metadata) tuples in chunks; returns the number written"""
+    for start in range(0, len(vectors), batch_size):
+        index.upsert(vectors=vectors[start:start + batch_size])
+    return len(vectors)
+
+
+# Process-wide index shared by agent and medical_knowledge
+_index = None
+_index_lock = threading.Lock()
+_backend = None
+
+
+def _connect_pinecone():
+    from pinecone import Pinecone
+
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"), environment=os.getenv("PINECONE_ENVIRONMENT"))
+    return pc.Index(os.getenv("PINECONE_INDEX"))
+
+
+def get_index():
+    """Return the configured vector index, falling back to the local one if Pinecone fails"""
+    global _index, _backend
+
+    if _index is not None:
+        return _index
+
+    with _index_lock:
+        if _index is None:
+            with loading("vector_index"):
+                if VECTOR_BACKEND != "local":
+                    try:
+                        _index = _connect_pinecone()
+                        _backend = "pinecone"
+                        print("✅ Pinecone initialized.")
+                    except Exception as e:
+                        print(f"[❌ Pinecone Initialization Error] {e}")
+                        print("↪️ Falling back to local vector index.")
+
+                if _index is None:
+                    _index = LocalVectorIndex()
+                    _backend = "local"
+                    print(f"✅ Local vector index ready ({LOCAL_INDEX_DIR}).")
+
+    return _index
+
+
+def get_backend():
+    """Return the name of the backend in use ("pinecone", "local" or None before first use)"""
+    return _backend